@@ -0,0 +1,248 @@
+import os, sys, json, argparse, tempfile
+from time import perf_counter_ns
+import pygame
+from settings import *
+from headless import HeadlessGame
+from sprites import Generic
+from soil import FARMABLE, TILLED
+from support import map_size, rng
+from save import snapshot, encode, decode, apply, save_game, load_game
+
+# RUN FROM THE code/ DIRECTORY:
+#   python benchmark.py
+#   python benchmark.py custom_draw level_tick --tiles 300 --plants 200 --rain 400
+#   python benchmark.py blits --output blits.json
+#   python benchmark.py save load --tiles 2000 --plants 1500
+
+def measure(func, repeat = 200, warmup = 10, setup = None):
+    # setup RUNS BEFORE EVERY CALL AND IS NOT TIMED
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = perf_counter_ns()
+        func()
+        samples.append(perf_counter_ns() - start)
+    return samples
+
+def percentile(ordered, fraction):
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) / 1e6,
+        'p50_ms': percentile(ordered, 0.5) / 1e6,
+        'p90_ms': percentile(ordered, 0.9) / 1e6,
+        'p99_ms': percentile(ordered, 0.99) / 1e6,
+    }
+
+def build_level(tiles = 100, plants = 50, rain = 200, map_objects = 0, seed = 0):
+    # A SEEDED HEADLESS LEVEL WITH THE REQUESTED LOAD
+    game = HeadlessGame(render = True, seed = seed)
+    level = game.level
+    soil_layer = level.soil_layer
+
+    #TILLED TILES AND PLANTS
+    farmable = soil_layer.grid.find(FARMABLE)
+    for x, y in farmable[:tiles]:
+        soil_layer.get_hit(((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE))
+    for x, y in soil_layer.grid.find(TILLED)[:plants]:
+        soil_layer.plant_seed(((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE), rng.choice(level.player.seeds))
+
+    #RAIN
+    level.raining = rain > 0
+    fill_rain(level, rain)
+
+    #EXTRA STATIC OBJECTS, STANDING IN FOR A LARGER OR BUSIER MAP
+    map_w, map_h = map_size()
+    surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
+    for _ in range(map_objects):
+        Generic(
+            pos = (rng.randint(0, map_w - TILE_SIZE), rng.randint(0, map_h - TILE_SIZE)),
+            surf = surf,
+            groups = [level.all_sprites, level.collision_sprites],
+        )
+
+    level.draw()
+    return game
+
+def fill_rain(level, amount):
+    # TOP BOTH RAIN POOLS UP TO amount LIVE PARTICLES
+    while len(level.rain.floors) < min(amount, RAIN_CAPACITY):
+        level.rain.create_floor()
+    while len(level.rain.drops) < min(amount, RAIN_CAPACITY):
+        level.rain.create_drops()
+
+def bench_custom_draw(game, params, repeat):
+    level = game.level
+    return summarize(measure(lambda: level.all_sprites.custom_draw(level.player), repeat))
+
+def bench_player_move(game, params, repeat):
+    # move() INCLUDES BOTH collision() PASSES
+    player = game.level.player
+    directions = [pygame.math.Vector2(1, 1), pygame.math.Vector2(-1, -1)]
+    step = 1 / TICK_RATE
+    state = {'tick': 0}
+
+    def setup():
+        state['tick'] += 1
+        player.direction = pygame.math.Vector2(directions[state['tick'] // 30 % 2])
+
+    return summarize(measure(lambda: player.move(step), repeat, setup = setup))
+
+def bench_create_soil_tiles(game, params, repeat):
+    # FULL REBUILD OF EVERY TILLED TILE
+    return summarize(measure(game.level.soil_layer.create_soil_tiles, repeat))
+
+def bench_till(game, params, repeat):
+    # ONE INCREMENTAL HOE STRIKE ON AN ALREADY TILLED CELL
+    soil_layer = game.level.soil_layer
+    tilled = soil_layer.grid.find(TILLED)
+    if not tilled:
+        return None
+    x, y = tilled[len(tilled) // 2]
+    return summarize(measure(lambda: soil_layer.update_soil_tiles(x, y), repeat))
+
+def bench_water_all(game, params, repeat):
+    soil_layer = game.level.soil_layer
+    return summarize(measure(soil_layer.water_all, repeat, setup = soil_layer.remove_water))
+
+def bench_rain_update(game, params, repeat):
+    level = game.level
+    step = 1 / TICK_RATE
+    return summarize(measure(
+        lambda: level.rain.update(step),
+        repeat,
+        setup = lambda: fill_rain(level, params['rain']),
+    ))
+
+def bench_plant_collision(game, params, repeat):
+    level = game.level
+    for plant in level.soil_layer.plant_sprites:
+        plant.harvestable = True
+        level.soil_layer.mark_harvestable(plant)
+
+    # THE PLAYER STANDS AWAY FROM THE FIELD SO NOTHING IS HARVESTED,
+    # THE COST SHOULD NOT DEPEND ON --plants
+    return summarize(measure(level.plant_collision, repeat))
+
+def bench_level_tick(game, params, repeat):
+    level = game.level
+    step = 1 / TICK_RATE
+
+    def tick():
+        level.update(step)
+        level.draw()
+
+    return summarize(measure(tick, repeat))
+
+def bench_blits(game, params, repeat):
+    # PER-SPRITE blit CALLS AGAINST ONE BATCHED blits / fblits CALL OVER THE SAME FRAME
+    display_surf = pygame.display.get_surface()
+    game.level.draw()
+    blit_list = list(game.level.all_sprites.blit_list)
+
+    def single():
+        for surf, dest in blit_list:
+            display_surf.blit(surf, dest)
+
+    results = {
+        'sprites': len(blit_list),
+        'blit': summarize(measure(single, repeat)),
+        'blits': summarize(measure(lambda: display_surf.blits(blit_list, doreturn = False), repeat)),
+    }
+    if hasattr(display_surf, 'fblits'):
+        results['fblits'] = summarize(measure(lambda: display_surf.fblits(blit_list), repeat))
+    return results
+
+def bench_save(game, params, repeat):
+    # snapshot IS THE PART AN AUTOSAVE RUNS ON THE MAIN THREAD
+    level = game.level
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sav')
+        save_game(path, level)
+        return {
+            'bytes': os.path.getsize(path),
+            'snapshot': summarize(measure(lambda: snapshot(level), repeat)),
+            'encode': summarize(measure(lambda: encode(snapshot(level)), repeat)),
+            'save_game': summarize(measure(lambda: save_game(path, level), repeat)),
+        }
+
+def bench_load(game, params, repeat):
+    # LOADING ONTO AN ALREADY BUILT LEVEL, THE STATIC MAP IS NOT REBUILT
+    level = game.level
+
+    #A LOAD MUST RESTORE EXACTLY WHAT WAS SAVED
+    state = snapshot(level)
+    apply(level, decode(encode(state)))
+    if snapshot(level) != state:
+        raise AssertionError('save round trip changed the game state')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sav')
+        save_game(path, level)
+        with open(path, 'rb') as file:
+            data = file.read()
+        state = decode(data)
+        return {
+            'decode': summarize(measure(lambda: decode(data), repeat)),
+            'apply': summarize(measure(lambda: apply(level, state), repeat)),
+            'load_game': summarize(measure(lambda: load_game(path, level), repeat)),
+        }
+
+BENCHMARKS = {
+    'custom_draw': bench_custom_draw,
+    'player_move': bench_player_move,
+    'create_soil_tiles': bench_create_soil_tiles,
+    'till': bench_till,
+    'water_all': bench_water_all,
+    'rain_update': bench_rain_update,
+    'plant_collision': bench_plant_collision,
+    'level_tick': bench_level_tick,
+    'blits': bench_blits,
+    'save': bench_save,
+    'load': bench_load,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Headless frame-time benchmarks for the level hot paths.')
+    parser.add_argument('names', nargs = '*', help = f'benchmarks to run, all by default: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--tiles', type = int, default = 100, help = 'tilled soil tiles')
+    parser.add_argument('--plants', type = int, default = 50, help = 'planted crops')
+    parser.add_argument('--rain', type = int, default = 200, help = 'live rain particles per layer')
+    parser.add_argument('--map-objects', type = int, default = 0, help = 'extra static colliding sprites')
+    parser.add_argument('--repeat', type = int, default = 200, help = 'timed runs per benchmark')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--output', help = 'also write the JSON results to this file')
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark {name}')
+
+    params = {
+        'tiles': args.tiles,
+        'plants': args.plants,
+        'rain': args.rain,
+        'map_objects': args.map_objects,
+        'seed': args.seed,
+    }
+
+    # EVERY BENCHMARK GETS A FRESH LEVEL SO THEY CANNOT AFFECT EACH OTHER
+    results = {}
+    for name in args.names or BENCHMARKS:
+        game = build_level(**params)
+        results[name] = BENCHMARKS[name](game, params, args.repeat)
+
+    report = json.dumps({'params': params, 'results': results}, indent = 4)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+    print(report)
+    sys.exit(0)
@@ -1,4 +1,46 @@
-import pygame
+class SimClock:
+    # SIMULATION TIME IN MILLISECONDS, ADVANCED ONLY BY UPDATE STEPS
+    def __init__(self) -> None:
+        self.ticks = 0
+
+    def advance(self, dt):
+        self.ticks += dt * 1000
+
+    def get_ticks(self):
+        return int(self.ticks)
+
+sim_clock = SimClock()
+
+def get_ticks():
+    return sim_clock.get_ticks()
+
+class Animation:
+    # ONE FRAME SEQUENCE SHARED BY EVERY SPRITE THAT PLAYS IT IN LOCKSTEP
+    def __init__(self, frames, speed) -> None:
+        self.frames = frames
+        self.speed = speed
+        self.frames_index = 0
+        self.image = self.frames[0]
+
+    def advance(self, dt):
+        self.frames_index += self.speed * dt
+        if self.frames_index >= len(self.frames):
+            self.frames_index = 0
+        self.image = self.frames[int(self.frames_index)]
+
+class AnimationClock:
+    # ADVANCES EVERY SHARED ANIMATION ONCE PER TICK INSTEAD OF ONCE PER SPRITE
+    def __init__(self) -> None:
+        self.animations = []
+
+    def add(self, frames, speed):
+        animation = Animation(frames, speed)
+        self.animations.append(animation)
+        return animation
+
+    def update(self, dt):
+        for animation in self.animations:
+            animation.advance(dt)
 
 class Timer:
     def __init__(self, duration, func = None) -> None:
@@ -9,19 +51,15 @@ class Timer:
     
     def activate(self):
         self.active = True
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = get_ticks()
 
     def deactivate(self):
         self.active = False
         self.start_time = 0
 
     def update(self):
-        current_time = pygame.time.get_ticks()
+        current_time = get_ticks()
         if current_time - self.start_time >= self.duration:
             if self.func and self.start_time != 0:
                 self.func()
             self.deactivate()
-
-
-
-
@@ -0,0 +1,93 @@
+import os, sys, argparse
+from time import perf_counter
+import pygame
+from settings import *
+from support import rng
+from gametimer import sim_clock
+from level import Level
+
+# RUN FROM THE code/ DIRECTORY:
+#   python headless.py --days 1000
+#   python headless.py --ticks 3600 --render
+
+class KeyState:
+    # INDEXED LIKE THE RESULT OF pygame.key.get_pressed()
+    def __init__(self, pressed = ()) -> None:
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+class ScriptedInput:
+    # REPLAYS A SCRIPT OF (ticks, keys) STEPS, ONE KeyState PER SIMULATION TICK
+    def __init__(self, script = ()) -> None:
+        self.steps = iter(script)
+        self.state = KeyState()
+        self.remaining = 0
+
+    def tick(self):
+        while self.remaining <= 0:
+            step = next(self.steps, None)
+            if step is None:
+                self.state = KeyState()
+                return
+            self.remaining, keys = step
+            self.state = KeyState(keys)
+        self.remaining -= 1
+
+    def __call__(self):
+        return self.state
+
+class HeadlessGame:
+    def __init__(self, script = (), render = False, seed = None) -> None:
+        # NO WINDOW AND NO MIXER, SO EVERY SOUND IS A NullSound
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+        # THE SAME SEED AND SCRIPT REPRODUCE THE SAME RUN
+        if seed is not None:
+            rng.seed(seed)
+        sim_clock.ticks = 0
+
+        self.input = ScriptedInput(script)
+        self.level = Level(get_keys = self.input)
+        self.render = render
+        self.step = 1 / TICK_RATE
+
+    def tick(self):
+        self.input.tick()
+        self.level.update(self.step)
+        if self.render:
+            self.level.draw()
+
+    def run(self, ticks):
+        for _ in range(ticks):
+            self.tick()
+
+    def advance_day(self):
+        # THE SAME WORK AS SLEEPING THROUGH THE NIGHT, WITHOUT THE TRANSITION
+        self.level.reset()
+
+    def run_days(self, days):
+        for _ in range(days):
+            self.advance_day()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Run the game without a window or audio.')
+    parser.add_argument('--ticks', type = int, default = 0, help = 'fixed simulation ticks to run')
+    parser.add_argument('--days', type = int, default = 0, help = 'farm days to advance')
+    parser.add_argument('--render', action = 'store_true', help = 'draw every tick to the dummy display')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed for the gameplay random stream')
+    args = parser.parse_args()
+
+    game = HeadlessGame(render = args.render, seed = args.seed)
+    start = perf_counter()
+    game.run(args.ticks)
+    game.run_days(args.days)
+    elapsed = perf_counter() - start
+
+    print(f'{args.ticks} ticks and {args.days} days in {elapsed:.3f}s')
+    sys.exit(0)
@@ -1,4 +1,6 @@
 import pygame
+from heapq import heappush, heappop
+from itertools import count
 from settings import *
 from player import Player
 from overlay import Overlay
@@ -8,25 +10,35 @@ from sprites import (
         WildFlower, Tree, 
         Interaction, Particle
     )
-from pytmx.util_pygame import load_pygame
 from support import *
 from soil import SoilLayer
 from sky import Rain, Sky
-from random import randint
 from menu import Menu
+from postprocess import PostProcess
+from gametimer import sim_clock, get_ticks, AnimationClock
+from spatial import SpatialGrid, merge_rects
 
 class Level:
-    def __init__(self) -> None:
+    def __init__(self, get_keys = pygame.key.get_pressed, autosave = None) -> None:
 
         #GET THE DISPLAY SURFACE
         self.display_surf = pygame.display.get_surface()
 
+        #INPUT SOURCE, pygame.key.get_pressed OR A SCRIPTED REPLACEMENT
+        self.get_keys = get_keys
+
+        #SAVES THE FARM EVERY NEW DAY WHEN GIVEN
+        self.autosave = autosave
+
         #SPRITE GROUPS
         self.all_sprites = CameraGroup()
-        self.collision_sprites = pygame.sprite.Group()
+        self.collision_sprites = CollisionGroup()
         self.tree_sprites = pygame.sprite.Group()
         self.interaction_sprites = pygame.sprite.Group() 
 
+        #SHARED ANIMATIONS
+        self.animations = AnimationClock()
+
         self.soil_layer = SoilLayer(self.all_sprites)
         self.setup()
         self.overlay = Overlay(self.player)
@@ -34,36 +46,36 @@ class Level:
 
         #SKY
         self.rain = Rain(self.all_sprites)
-        self.raining = randint(0,10) > 7
+        self.raining = rng.randint(0,10) > 7
         self.soil_layer.raining = self.raining
         self.sky = Sky()
+        self.post_process = PostProcess(self.sky, self.transition)
 
         #SHOP
         self.menu = Menu(
             player = self.player,
             toggle_menu = self.toggle_shop,
+            get_keys = self.get_keys,
         )
         self.shop_active = False
 
+        #DIRTY RECT STATE
+        self.screen_state = None
+        self.overlay_state = None
+        self.menu_state = None
+
         # MUSIC
-        self.success = pygame.mixer.Sound(f'{AUDIO_DIR}/success.wav')
+        self.success = import_sound(f'{AUDIO_DIR}/success.wav')
         self.success.set_volume(0.3)
 
-        self.music = pygame.mixer.Sound(f'{AUDIO_DIR}/music.mp3')
+        self.music = import_sound(f'{AUDIO_DIR}/music.mp3')
         self.music.play(loops = -1)
 
     def setup(self):
-        tmx_data = load_pygame(f'{DATA_DIR}/map.tmx')
+        tmx_data = import_map()
 
         #HOUSE
-        for layer in ['HouseFloor', 'HouseFurnitureBottom']:
-            for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
-                Generic(
-                    pos = (x * TILE_SIZE, y * TILE_SIZE), 
-                    surf= surf, 
-                    groups = self.all_sprites, 
-                    z= LAYERS['house bottom']
-                )
+        self.create_chunks(tmx_data, ['HouseFloor', 'HouseFurnitureBottom'], LAYERS['house bottom'])
 
         
         for layer in ['HouseWalls', 'HouseFurnitureTop']:
@@ -84,11 +96,11 @@ class Level:
         
         #WATER
         water_path = WATER_DIR
-        water_frames = import_folder(water_path)
+        water_animation = self.animations.add(import_folder(water_path), speed = 5)
         for x, y, surf in tmx_data.get_layer_by_name('Water').tiles():
             Water(
                 pos = (x * TILE_SIZE, y * TILE_SIZE), 
-                frames = water_frames, 
+                animation = water_animation, 
                 groups = [self.all_sprites, self.collision_sprites],
             ) 
 
@@ -119,7 +131,8 @@ class Level:
                     tree_sprites = self.tree_sprites,
                     interaction = self.interaction_sprites,
                     soil_layer = self.soil_layer,
-                    toggle_shop = self.toggle_shop
+                    toggle_shop = self.toggle_shop,
+                    get_keys = self.get_keys,
                 ) 
             if obj.name == 'Bed':
                 Interaction(
@@ -148,11 +161,41 @@ class Level:
 
         Generic(
             pos = (0, 0), 
-            surf = pygame.image.load(f'{WORLD_DIR}/ground.png').convert_alpha(), 
+            surf = import_ground(), 
             groups=self.all_sprites,
             z = LAYERS['ground'],
         )
 
+        #PARTICLE SILHOUETTES, BUILT AT LOAD INSTEAD OF ON THE FIRST HIT
+        for tree in self.tree_sprites.sprites():
+            import_silhouette(tree.image)
+            import_silhouette(tree.apples_surf)
+        for seed in self.player.seeds:
+            for surf in import_folder(FRUIT_DIR/seed):
+                import_silhouette(surf)
+
+    def create_chunks(self, tmx_data, layers, z):
+        # FLAT TILE LAYERS NEVER OVERLAP THE PLAYER, SO THEY ARE
+        # COMPOSITED INTO A FEW CHUNK SURFACES INSTEAD OF ONE SPRITE PER TILE
+        chunks = {}
+        for layer in layers:
+            for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
+                tile_rect = surf.get_rect(topleft = (x * TILE_SIZE, y * TILE_SIZE))
+                for chunk_y in range(tile_rect.top // CHUNK_SIZE, (tile_rect.bottom - 1) // CHUNK_SIZE + 1):
+                    for chunk_x in range(tile_rect.left // CHUNK_SIZE, (tile_rect.right - 1) // CHUNK_SIZE + 1):
+                        if (chunk_x, chunk_y) not in chunks:
+                            chunks[(chunk_x, chunk_y)] = pygame.Surface((CHUNK_SIZE, CHUNK_SIZE), pygame.SRCALPHA)
+                        chunk_pos = (tile_rect.left - chunk_x * CHUNK_SIZE, tile_rect.top - chunk_y * CHUNK_SIZE)
+                        chunks[(chunk_x, chunk_y)].blit(surf, chunk_pos)
+
+        for (chunk_x, chunk_y), surf in chunks.items():
+            Generic(
+                pos = (chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE),
+                surf = surf.convert_alpha(),
+                groups = self.all_sprites,
+                z = z,
+            )
+
     def reset(self):
         #PLANTS
         self.soil_layer.update_plants()
@@ -162,7 +205,7 @@ class Level:
         self.soil_layer.remove_water()
 
         #RANDOMIZE THE RAIN
-        self.raining = randint(0,10) > 7
+        self.raining = rng.randint(0,10) > 7
         self.soil_layer.raining = self.raining
         if self.raining:
             self.soil_layer.water_all()
@@ -174,16 +217,17 @@ class Level:
             tree.create_fruit()
 
         #SKY 
-        self.sky.start_color = [255, 255, 255]
+        self.sky.reset()
+
+        #AUTOSAVE, WRITTEN IN THE BACKGROUND SO THE TRANSITION KEEPS RUNNING
+        if self.autosave:
+            self.autosave.save(self)
 
     def plant_collision(self):
-        if self.soil_layer.plant_sprites:
-            for plant in self.soil_layer.plant_sprites.sprites():
-                if plant.harvestable and plant.rect.colliderect(self.player.hitbox):
-                    self.player_add(plant.plant_type)
-                    plant.kill()
-                    Particle(plant.rect.topleft, plant.image, self.all_sprites, z = LAYERS['main'])
-                    self.soil_layer.grid[plant.rect.centery // TILE_SIZE][plant.rect.centerx // TILE_SIZE].remove('P')
+        for plant in self.soil_layer.harvestable_plants(self.player.hitbox):
+            self.player_add(plant.plant_type)
+            self.soil_layer.remove_plant(plant)
+            Particle(plant.rect.topleft, plant.image, self.all_sprites, z = LAYERS['main'])
 
     def player_add(self, item):
         self.player.item_inventory[item] += 1
@@ -191,56 +235,277 @@ class Level:
     def toggle_shop(self):
         self.shop_active = not self.shop_active
 
-    def run(self, dt):
-        #DRAWING LOGIC
-        self.display_surf.fill('black')
-        self.all_sprites.custom_draw(self.player)
-        
+    def update(self, dt):
+        sim_clock.advance(dt)
+
         #UPDATES
         if self.shop_active:
-            self.menu.update()
+            self.menu.input()
+            # THE PLAYER IS NOT UPDATED, SO THE CAMERA MUST NOT KEEP INTERPOLATING ITS LAST STEP
+            self.player.prev_center.update(self.player.rect.center)
         else:
+            self.animations.update(dt)
             self.all_sprites.update(dt)
             self.plant_collision()
-        
+
         #WEATHER
-        self.overlay.display()
-        
-        if self.raining and not self.shop_active:
-            self.rain.update() 
-        
-        self.sky.display(dt)
+        if not self.shop_active:
+            self.rain.update(dt, spawn = self.raining)
+
+        self.sky.update(dt)
 
-        #TRANSITION OVERLAY 
+        #TRANSITION
         if self.player.sleep:
-            self.transition.play()
-        
+            self.transition.update()
+
+    def draw(self, alpha = 1):
+        # RETURNS THE SCREEN RECTS THAT CHANGED THIS FRAME
+        if DIRTY_RECTS:
+            return self.draw_dirty(alpha)
+
+        self.draw_region(alpha)
+        return [self.display_surf.get_rect()]
+
+    def draw_region(self, alpha = 1, area = None):
+        #DRAWING LOGIC
+        self.display_surf.set_clip(area)
+        self.display_surf.fill('black')
+        self.all_sprites.custom_draw(self.player, alpha, area)
+
+        if self.shop_active:
+            self.menu.display()
+
+        self.overlay.display()
+
+        #DAYLIGHT AND TRANSITION TINT
+        self.post_process.display()
+        self.display_surf.set_clip(None)
+
+    def draw_dirty(self, alpha = 1):
+        # WHILE THE CAMERA IS STILL ONLY THE CHANGED REGIONS ARE REDRAWN,
+        # ANYTHING THAT TOUCHES THE WHOLE SCREEN FALLS BACK TO A FULL REDRAW
+        self.all_sprites.update_offset(self.player, alpha)
+        dirty = self.all_sprites.find_dirty(self.player)
+
+        screen_state = (
+            (round(self.all_sprites.offset.x), round(self.all_sprites.offset.y)),
+            self.shop_active,
+            self.post_process.get_tint(),
+        )
+        if screen_state != self.screen_state or self.player.sleep or self.rain.floors or self.rain.drops:
+            self.screen_state = screen_state
+            self.draw_region(alpha)
+            return [self.display_surf.get_rect()]
+
+        #UI
+        overlay_state = (self.player.selected_tool, self.player.selected_seed)
+        if overlay_state != self.overlay_state:
+            self.overlay_state = overlay_state
+            dirty.append(self.overlay.area)
+
+        if self.shop_active:
+            menu_state = self.menu.state()
+            if menu_state != self.menu_state:
+                self.menu_state = menu_state
+                dirty.append(self.menu.area)
+
+        dirty = merge_rects(dirty, DIRTY_RECT_LIMIT)
+        for area in dirty:
+            self.draw_region(alpha, area)
+        return dirty
 
+    def run(self, dt):
+        self.update(dt)
+        return self.draw()
+        
 class CameraGroup(pygame.sprite.Group):
     def __init__(self):
         super().__init__()
         self.display_surf = pygame.display.get_surface()
         self.offset = pygame.math.Vector2()
-    
-    def custom_draw(self, player):
-        self.offset.x = player.rect.centerx - SCREEN_WIDTH / 2
-        self.offset.y = player.rect.centery - SCREEN_HEIGHT / 2
 
+        #RENDER QUEUE
+        self.layers = {layer: SpatialGrid() for layer in LAYERS.values()}
+        self.sprite_layers = {}
+        self.pending = {}
+        self.dynamic = {}
+        self.viewport = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.renderers = {}
+        self.blit_list = []
+        self.drawn = {}
+
+        #UPDATE SCHEDULE
+        self.active = {}
+        self.deadlines = []
+        self.deadline_order = count()
+
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        # SPRITES SET THEIR z AFTER JOINING THEIR GROUPS,
+        # SO BUCKETING IS DEFERRED UNTIL THE NEXT DRAW
+        self.pending[sprite] = None
+
+        #ONLY SPRITES WITH THEIR OWN update() ARE EVER UPDATED
+        if type(sprite).update is not pygame.sprite.Sprite.update:
+            self.active[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.active.pop(sprite, None)
+        self.dynamic.pop(sprite, None)
+        layer = self.sprite_layers.pop(sprite, None)
+        if layer is None:
+            self.pending.pop(sprite, None)
+        else:
+            self.layers[layer].remove(sprite)
+
+    def refresh(self, sprite):
+        # RE-INDEX A STATIC SPRITE AFTER ITS z OR rect CHANGED
+        layer = self.sprite_layers.get(sprite)
+        if layer is not None:
+            self.layers[layer].remove(sprite)
+            self.layers.setdefault(sprite.z, SpatialGrid()).insert(sprite, sprite.rect)
+            self.sprite_layers[sprite] = sprite.z
+
+    def expire(self, sprite, deadline):
+        # KILL sprite ONCE THE SIMULATION CLOCK PASSES deadline
+        heappush(self.deadlines, (deadline, next(self.deadline_order), sprite))
+
+    def update(self, dt):
+        # COST SCALES WITH THE ACTIVE AND EXPIRING SPRITES, NOT WITH THE SIZE OF THE WORLD
+        deadlines = self.deadlines
+        current_time = get_ticks()
+        while deadlines and deadlines[0][0] < current_time:
+            heappop(deadlines)[2].kill()
+
+        for sprite in list(self.active):
+            sprite.update(dt)
+
+    def add_renderer(self, renderer):
+        # NON-SPRITE DRAWABLES (LIKE PARTICLE SYSTEMS) QUEUED AFTER THE SPRITES OF THEIR z
+        self.renderers.setdefault(renderer.z, []).append(renderer)
+
+    def flush(self):
+        for sprite in self.pending:
+            self.layers.setdefault(sprite.z, SpatialGrid()).insert(sprite, sprite.rect)
+            self.sprite_layers[sprite] = sprite.z
+            if getattr(sprite, 'dynamic', False):
+                self.dynamic[sprite] = None
+        self.pending.clear()
+
+        #MOVING SPRITES
+        for sprite in self.dynamic:
+            self.layers[sprite.z].move(sprite, sprite.rect)
+
+    def update_offset(self, player, alpha = 1):
+        # THE CAMERA FOLLOWS THE PLAYER INTERPOLATED BETWEEN THE LAST TWO UPDATES
+        center = player.prev_center.lerp(player.rect.center, alpha)
+        self.offset.x = center.x - SCREEN_WIDTH / 2
+        self.offset.y = center.y - SCREEN_HEIGHT / 2
+        self.viewport.topleft = (self.offset.x, self.offset.y)
+
+    def find_dirty(self, player):
+        # COMPARE WHAT EVERY VISIBLE SPRITE DRAWS NOW WITH WHAT IT DREW LAST TIME
+        self.flush()
+        offset_x, offset_y = round(self.offset.x), round(self.offset.y)
+        player_x = SCREEN_WIDTH // 2 - player.rect.width // 2
+        player_y = SCREEN_HEIGHT // 2 - player.rect.height // 2
+
+        drawn = {}
+        dirty = []
         for layer in LAYERS.values():
-            for sprite in sorted(self.sprites(), key = lambda sprite: sprite.rect.centery):
-                if sprite.z == layer:
-                    offset_rect = sprite.rect.copy()
-                    offset_rect.center -= self.offset
-                    self.display_surf.blit(sprite.image, offset_rect)
-                
-                    #ANALYTICS OF POSITION
-                    # if sprite == player:
-                    #     pygame.draw.rect(self.display_surf, 'red', offset_rect, 5)
-                    #     hitbox_rect = player.hitbox.copy()
-                    #     hitbox_rect.center = offset_rect.center
-                    #     pygame.draw.rect(self.display_surf, 'green', hitbox_rect, 5)
-                    #     target_pos = offset_rect.center + PLAYER_TOOL_OFFSET[player.status.split('_')[0]]
-                    #     pygame.draw.circle(self.display_surf, 'blue', target_pos, 5)
-
-    
+            for sprite in self.layers[layer].query(self.viewport):
+                if sprite is player:
+                    state = (sprite.image, player_x, player_y)
+                else:
+                    state = (sprite.image, sprite.rect.x - offset_x, sprite.rect.y - offset_y)
+                drawn[sprite] = state
+
+                old_state = self.drawn.pop(sprite, None)
+                if old_state != state:
+                    dirty.append(pygame.Rect(state[1:], state[0].get_size()))
+                    if old_state:
+                        dirty.append(pygame.Rect(old_state[1:], old_state[0].get_size()))
+
+        #SPRITES THAT LEFT THE SCREEN OR WERE KILLED
+        for image, x, y in self.drawn.values():
+            dirty.append(pygame.Rect((x, y), image.get_size()))
+        self.drawn = drawn
+
+        screen_rect = self.display_surf.get_rect()
+        return [rect.clip(screen_rect) for rect in dirty if rect.colliderect(screen_rect)]
+
+    def custom_draw(self, player, alpha = 1, area = None):
+        self.update_offset(player, alpha)
+
+        self.flush()
+        offset_x, offset_y = round(self.offset.x), round(self.offset.y)
+        player_x = SCREEN_WIDTH // 2 - player.rect.width // 2
+        player_y = SCREEN_HEIGHT // 2 - player.rect.height // 2
+        query_rect = area.move(offset_x, offset_y) if area else self.viewport
+
+        # ONE (surface, dest) LIST FOR THE WHOLE FRAME, SUBMITTED IN A SINGLE CALL
+        blit_list = self.blit_list
+        blit_list.clear()
+        for layer in LAYERS.values():
+            bucket = self.layers[layer].query(query_rect)
+            if layer in Y_SORT_LAYERS:
+                bucket = sorted(bucket, key = lambda sprite: sprite.rect.centery)
+
+            for sprite in bucket:
+                if sprite is player:
+                    blit_list.append((sprite.image, (player_x, player_y)))
+                else:
+                    blit_list.append((sprite.image, (sprite.rect.x - offset_x, sprite.rect.y - offset_y)))
+
+                #ANALYTICS OF POSITION
+                # if sprite == player:
+                #     offset_rect = player.rect.copy()
+                #     offset_rect.topleft = (player_x, player_y)
+                #     pygame.draw.rect(self.display_surf, 'red', offset_rect, 5)
+                #     hitbox_rect = player.hitbox.copy()
+                #     hitbox_rect.center = offset_rect.center
+                #     pygame.draw.rect(self.display_surf, 'green', hitbox_rect, 5)
+                #     target_pos = offset_rect.center + PLAYER_TOOL_OFFSET[player.status.split('_')[0]]
+                #     pygame.draw.circle(self.display_surf, 'blue', target_pos, 5)
+
+            for renderer in self.renderers.get(layer, ()):
+                renderer.queue(blit_list, (offset_x, offset_y))
+
+        self.blit(blit_list)
+
+    def blit(self, blit_list):
+        # fblits ONLY EXISTS IN pygame-ce, blits IS THE pygame FALLBACK
+        if hasattr(self.display_surf, 'fblits'):
+            self.display_surf.fblits(blit_list)
+        else:
+            self.display_surf.blits(blit_list, doreturn = False)
+
+class CollisionGroup(pygame.sprite.Group):
+    def __init__(self):
+        super().__init__()
+        self.grid = SpatialGrid(TILE_SIZE)
+        self.pending = {}
+
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        # HITBOXES ARE CREATED AFTER THE SPRITE JOINS ITS GROUPS
+        self.pending[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.pending.pop(sprite, None)
+        self.grid.remove(sprite)
+
+    def refresh(self, sprite):
+        # RE-INDEX A SPRITE AFTER ITS HITBOX CHANGED
+        if sprite in self.grid:
+            self.grid.move(sprite, sprite.hitbox)
+
+    def query(self, rect):
+        for sprite in self.pending:
+            if hasattr(sprite, 'hitbox'):
+                self.grid.insert(sprite, sprite.hitbox)
+        self.pending.clear()
 
+        return self.grid.query(rect)
@@ -1,28 +1,85 @@
-import pygame, sys
+import pygame, os, sys, argparse
 from settings import *
 from level import Level 
+from replay import Recorder
+from profiler import Profiler
+from save import AutoSave, load_game
 
 #Display money funksiyasinda qaldin, menu faylinda, hansisa bir error falan yoxdu
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(self, recorder = None, profile = None, save_path = SAVE_FILE, load = True) -> None:
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Pydew Valley')
         self.clock = pygame.time.Clock()
-        self.level = Level()
+
+        #RECORDING, THE RECORDER SEEDS THE RANDOM STREAM BEFORE THE LEVEL IS BUILT
+        self.recorder = recorder
+        #A RECORDING PLAYS A THROWAWAY SEEDED FARM, SO IT NEVER LOADS OR AUTOSAVES
+        self.autosave = None if recorder else AutoSave(save_path)
+        self.level = Level(get_keys = recorder or pygame.key.get_pressed, autosave = self.autosave)
+
+        if load and self.autosave and os.path.exists(save_path):
+            try:
+                load_game(save_path, self.level)
+            except (OSError, ValueError) as error:
+                # KEEP THE BAD FILE FOR INSPECTION INSTEAD OF LETTING THE NEXT AUTOSAVE REPLACE IT
+                bad_path = f'{save_path}.bad'
+                os.replace(save_path, bad_path)
+                print(f'Could not load {save_path}: {error}. It was moved to {bad_path}, starting a new farm.', file = sys.stderr)
+
+        #PROFILER, F3 TOGGLES IT AND THE HISTOGRAM IS WRITTEN TO profile ON EXIT
+        self.profiler = Profiler(self.level)
+        self.profile = profile
+        if profile:
+            self.profiler.enable()
+
+        #FIXED TIMESTEP
+        self.step = 1 / TICK_RATE
+        self.accumulator = 0
     
     def run(self):
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    if self.recorder:
+                        self.recorder.save()
+                    if self.profile:
+                        self.profiler.dump(self.profile)
+                    if self.autosave:
+                        self.autosave.wait()
                     pygame.quit()
                     sys.exit()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.profiler.toggle()
             
-            dt = self.clock.tick() / 1000
-            self.level.run(dt)
-            pygame.display.update()
+            self.accumulator += self.clock.tick(MAX_FPS) / 1000
+
+            # THE SIMULATION ALWAYS ADVANCES IN WHOLE STEPS,
+            # A BACKLOG BEYOND MAX_STEPS IS DROPPED INSTEAD OF SPIRALLING
+            steps = 0
+            while self.accumulator >= self.step and steps < MAX_STEPS:
+                if self.recorder:
+                    self.recorder.tick()
+                self.level.update(self.step)
+                self.accumulator -= self.step
+                steps += 1
+            if steps == MAX_STEPS:
+                self.accumulator = min(self.accumulator, self.step)
+
+            dirty = self.level.draw(self.accumulator / self.step)
+            pygame.display.update(dirty)
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = 'Pydew Valley')
+    parser.add_argument('--record', help = 'record input and the random seed to this file')
+    parser.add_argument('--profile', help = 'start with the profiler on and write its histogram (.csv or .json) here on exit')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed for the gameplay random stream')
+    parser.add_argument('--save', default = SAVE_FILE, help = 'save file, loaded on start and written every new day')
+    parser.add_argument('--new', action = 'store_true', help = 'start a new farm instead of loading the save')
+    args = parser.parse_args()
+
+    recorder = Recorder(args.record, args.seed) if args.record else None
+    game = Game(recorder, args.profile, args.save, not args.new)
+    game.run()
@@ -3,10 +3,11 @@ from settings import *
 from gametimer import Timer
 
 class Menu:
-    def __init__(self, player, toggle_menu) -> None:
+    def __init__(self, player, toggle_menu, get_keys = pygame.key.get_pressed) -> None:
         #GENERAL SETUP
         self.player = player
         self.toggle_menu = toggle_menu
+        self.get_keys = get_keys
         self.display_surf = pygame.display.get_surface()
         self.font = pygame.font.Font(f'{FONT_DIR}/LycheeSoda.ttf', 30)
 
@@ -24,11 +25,27 @@ class Menu:
         self.index = 0
         self.timer = Timer(200)
 
+        #CACHED PANEL, ONLY RE-RENDERED WHEN state() CHANGES
+        self.panel_surf = pygame.Surface(self.area.size, pygame.SRCALPHA)
+        self.panel_state = None
+
+    def state(self):
+        return (
+            self.index,
+            self.player.money,
+            self.player.item_inventory.version,
+            self.player.seed_inventory.version,
+        )
+
+    def local(self, rect):
+        # SCREEN POSITION TO A POSITION ON THE CACHED PANEL
+        return rect.move(-self.area.left, -self.area.top)
+
     def display_money(self):
         text_surf = self.font.render(f'{self.player.money}', False, 'Black')
         text_rect = text_surf.get_rect(midbottom = (SCREEN_WIDTH / 2, SCREEN_HEIGHT - 20))
 
-        self.display_surf.blit(text_surf, text_rect)
+        self.panel_surf.blit(text_surf, self.local(text_rect))
 
     def setup(self):
         #TEXT SURFACES
@@ -50,6 +67,11 @@ class Menu:
                 self.total_height
             )
         
+        #SCREEN AREA COVERED BY THE PANEL AND THE MONEY TEXT
+        self.money_area = pygame.Rect(0, 0, self.width, self.font.get_height())
+        self.money_area.midbottom = (SCREEN_WIDTH / 2, SCREEN_HEIGHT - 20)
+        self.area = self.main_rect.union(self.money_area)
+
         #BUY / SELL TEXT SURFACE
         self.buy_text = self.font.render('buy', False, 'Black')
         self.sell_text = self.font.render('sell', False, 'Black')
@@ -58,29 +80,29 @@ class Menu:
 
         #BACKGROUND
         bg_rect = pygame.Rect(self.main_rect.left, top, self.width, text_surf.get_height() + (self.padding * 2))
-        pygame.draw.rect(self.display_surf, 'White', bg_rect, 0, 4)
+        pygame.draw.rect(self.panel_surf, 'White', self.local(bg_rect), 0, 4)
 
         #TEXT
         text_rect = text_surf.get_rect(midleft = (self.main_rect.left + 20, bg_rect.centery))
-        self.display_surf.blit(text_surf, text_rect)
+        self.panel_surf.blit(text_surf, self.local(text_rect))
 
         #AMOUNT
         amount_surf = self.font.render(str(amount), False, 'Black')
         amount_rect = amount_surf.get_rect(midright = (self.main_rect.right - 20, bg_rect.centery))
-        self.display_surf.blit(amount_surf, amount_rect)
+        self.panel_surf.blit(amount_surf, self.local(amount_rect))
 
         #SELECTED
         if selected:
-            pygame.draw.rect(self.display_surf, 'black', bg_rect, 4, 4)
+            pygame.draw.rect(self.panel_surf, 'black', self.local(bg_rect), 4, 4)
             if self.index <= self.sell_border: #SELL PART
                 pos_rect = self.sell_text.get_rect(midleft = (self.main_rect.left + 150 ,bg_rect.centery))
-                self.display_surf.blit(self.sell_text, pos_rect)
+                self.panel_surf.blit(self.sell_text, self.local(pos_rect))
             else: #BUY PART
                 pos_rect = self.buy_text.get_rect(midleft = (self.main_rect.left + 150 ,bg_rect.centery))
-                self.display_surf.blit(self.buy_text, pos_rect)
+                self.panel_surf.blit(self.buy_text, self.local(pos_rect))
 
     def input(self):
-        keys = pygame.key.get_pressed()
+        keys = self.get_keys()
         self.timer.update()
 
         if keys[pygame.K_ESCAPE]:
@@ -119,13 +141,20 @@ class Menu:
         if self.index > len(self.options) - 1:
             self.index = 0
 
-    def update(self):
-
+    def render(self):
+        self.panel_surf.fill((0, 0, 0, 0))
         self.display_money()
-        self.input()
 
+        amount_list = list(self.player.item_inventory.values()) + list(self.player.seed_inventory.values())
         for text_index, text_surf in enumerate(self.text_surfs):
             top = self.main_rect.top + text_index * (text_surf.get_height() + (self.padding * 2) + self.space)
-            amount_list = list(self.player.item_inventory.values()) + list(self.player.seed_inventory.values())
             amount = amount_list[text_index]
-            self.show_entry(text_surf, amount, top, self.index == text_index)
\ No newline at end of file
+            self.show_entry(text_surf, amount, top, self.index == text_index)
+
+    def display(self):
+        state = self.state()
+        if state != self.panel_state:
+            self.panel_state = state
+            self.render()
+
+        self.display_surf.blit(self.panel_surf, self.area)
@@ -11,19 +11,21 @@ class Overlay:
         overlay_path = OVERLAY_DIR
         self.tools_surf = {tool:pygame.image.load(f'{overlay_path}/{tool}.png').convert_alpha() for tool in player.tools}
         self.seeds_surf = {seed:pygame.image.load(f'{overlay_path}/{seed}.png').convert_alpha() for seed in player.seeds}
-        print(OVERLAY_DIR)
-        print(self.tools_surf)
-        print(self.seeds_surf)
+
+        #SCREEN AREA COVERED BY EVERY TOOL AND SEED ICON
+        icon_rects = [surf.get_rect(midbottom = OVERLAY_POSITIONS['tool']) for surf in self.tools_surf.values()]
+        icon_rects += [surf.get_rect(midbottom = OVERLAY_POSITIONS['seed']) for surf in self.seeds_surf.values()]
+        self.area = icon_rects[0].unionall(icon_rects[1:])
+
+        #ICON POSITIONS NEVER CHANGE, SO EVERY (SURFACE, RECT) PAIR IS BUILT ONCE
+        self.tools_blit = {tool: (surf, surf.get_rect(midbottom = OVERLAY_POSITIONS['tool'])) for tool, surf in self.tools_surf.items()}
+        self.seeds_blit = {seed: (surf, surf.get_rect(midbottom = OVERLAY_POSITIONS['seed'])) for seed, surf in self.seeds_surf.items()}
 
     def display(self):
         #TOOL
-        tools_surf = self.tools_surf[self.player.selected_tool]
-        tool_rect = tools_surf.get_rect(midbottom = OVERLAY_POSITIONS['tool'])
-        self.display_surf.blit(tools_surf, tool_rect)
+        self.display_surf.blit(*self.tools_blit[self.player.selected_tool])
 
         #SEEDS
-        seeds_surf = self.seeds_surf[self.player.selected_seed]
-        seed_rect = seeds_surf.get_rect(midbottom = OVERLAY_POSITIONS['seed'])
-        self.display_surf.blit(seeds_surf, seed_rect) 
+        self.display_surf.blit(*self.seeds_blit[self.player.selected_seed]) 
 
 
@@ -3,8 +3,23 @@ from settings import *
 from support import *
 from gametimer import Timer
 
+class Inventory(dict):
+    # COUNTS ITS CHANGES SO CACHED VIEWS KNOW WHEN THEY ARE STALE
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def __setitem__(self, key, value):
+        if key not in self or self[key] != value:
+            super().__setitem__(key, value)
+            self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
 class Player(pygame.sprite.Sprite):
-    def __init__(self, pos, group, collision_sprites, tree_sprites, interaction, soil_layer, toggle_shop) -> None:
+    def __init__(self, pos, group, collision_sprites, tree_sprites, interaction, soil_layer, toggle_shop, get_keys = pygame.key.get_pressed) -> None:
         super().__init__(group)
 
         self.import_assets()
@@ -15,10 +30,12 @@ class Player(pygame.sprite.Sprite):
         self.image = self.animations[self.status][self.frame_index]
         self.rect = self.image.get_rect(center = pos)
         self.z = LAYERS['main']
+        self.dynamic = True
 
         #MOVEMENTS ATTRIBUTES
         self.direction = pygame.math.Vector2()
         self.pos = pygame.math.Vector2(self.rect.center)
+        self.prev_center = pygame.math.Vector2(self.rect.center)
         self.speed = 200
 
         #COLLISION SPRITES
@@ -44,17 +61,17 @@ class Player(pygame.sprite.Sprite):
         self.selected_seed = self.seeds[self.seed_index]
 
         #INVENTORY
-        self.item_inventory = {
+        self.item_inventory = Inventory({
             'wood': 0,
             'apple': 0,
             'corn': 0,
             'tomato': 0,
-        }
+        })
 
-        self.seed_inventory = {
+        self.seed_inventory = Inventory({
             'corn': 5,
             'tomato': 5,
-        }
+        })
 
         self.money = 200
 
@@ -64,9 +81,10 @@ class Player(pygame.sprite.Sprite):
         self.sleep = False
         self.soil_layer = soil_layer
         self.toggle_shop = toggle_shop
+        self.get_keys = get_keys
 
         #SOUND
-        self.watering = pygame.mixer.Sound(f'{AUDIO_DIR}/water.mp3')
+        self.watering = import_sound(f'{AUDIO_DIR}/water.mp3')
         self.watering.set_volume(0.2)
 
     def get_target_pos(self):
@@ -111,7 +129,7 @@ class Player(pygame.sprite.Sprite):
         self.image = self.animations[self.status][int(self.frame_index)]
 
     def input(self):
-        keys = pygame.key.get_pressed()
+        keys = self.get_keys()
 
         if not self.timers['tool use'].active and not self.sleep:
             #DIRECTIONS
@@ -189,23 +207,23 @@ class Player(pygame.sprite.Sprite):
             timer.update()
 
     def collision(self, direction):
-        for sprite in self.collison_sprites.sprites():
-            if hasattr(sprite, 'hitbox'):
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if direction == 'horizontal':
-                        if self.direction.x > 0: # moving right
-                            self.hitbox.right = sprite.hitbox.left
-                        if self.direction.x < 0: # moving left
-                            self.hitbox.left = sprite.hitbox.right
-                        self.rect.centerx = self.hitbox.centerx
-                        self.pos.x = self.hitbox.centerx
-                    if direction == 'vertical':
-                        if self.direction.y > 0: # moving down
-                            self.hitbox.bottom = sprite.hitbox.top
-                        if self.direction.y < 0: # moving up
-                            self.hitbox.top = sprite.hitbox.bottom
-                        self.rect.centery = self.hitbox.centery
-                        self.pos.y = self.hitbox.centery
+        # ONLY THE HITBOXES IN THE GRID CELLS UNDER THE PLAYER ARE TESTED
+        for sprite in self.collison_sprites.query(self.hitbox):
+            if sprite.hitbox.colliderect(self.hitbox):
+                if direction == 'horizontal':
+                    if self.direction.x > 0: # moving right
+                        self.hitbox.right = sprite.hitbox.left
+                    if self.direction.x < 0: # moving left
+                        self.hitbox.left = sprite.hitbox.right
+                    self.rect.centerx = self.hitbox.centerx
+                    self.pos.x = self.hitbox.centerx
+                if direction == 'vertical':
+                    if self.direction.y > 0: # moving down
+                        self.hitbox.bottom = sprite.hitbox.top
+                    if self.direction.y < 0: # moving up
+                        self.hitbox.top = sprite.hitbox.bottom
+                    self.rect.centery = self.hitbox.centery
+                    self.pos.y = self.hitbox.centery
 
     def move(self, dt):
 
@@ -226,6 +244,7 @@ class Player(pygame.sprite.Sprite):
         self.collision('vertical')
 
     def update(self, dt):
+        self.prev_center.update(self.rect.center)
         self.input()
         self.move(dt)
         self.update_timers()
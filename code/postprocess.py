@@ -0,0 +1,33 @@
+import pygame
+from settings import *
+
+IDENTITY = (255, 255, 255)
+
+class PostProcess:
+    # THE DAYLIGHT TINT AND THE SLEEP FADE ARE COMBINED INTO ONE FULL-SCREEN MULTIPLY,
+    # WHICH IS SKIPPED ENTIRELY WHILE THE COMBINED TINT IS WHITE
+    def __init__(self, sky, transition) -> None:
+        self.display_surf = pygame.display.get_surface()
+        self.sky = sky
+        self.transition = transition
+
+        #TINT SURFACE, ONLY REFILLED WHEN THE TINT CHANGES
+        self.image = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.tint = IDENTITY
+        self.image.fill(self.tint)
+
+    def get_tint(self):
+        brightness = self.transition.brightness()
+        if brightness == 255:
+            return self.sky.color()
+        return tuple(value * brightness // 255 for value in self.sky.color())
+
+    def display(self):
+        tint = self.get_tint()
+        if tint == IDENTITY:
+            return
+
+        if tint != self.tint:
+            self.tint = tint
+            self.image.fill(tint)
+        self.display_surf.blit(self.image, (0, 0), special_flags = pygame.BLEND_RGB_MULT)
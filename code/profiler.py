@@ -0,0 +1,181 @@
+import csv, json
+from collections import deque
+from time import perf_counter_ns
+import pygame
+from settings import *
+
+#TIMED SECTIONS AND THEIR GRAPH COLOURS, update AND draw ARE THE TOTALS
+SECTIONS = {
+    'sprites': (86, 180, 233),
+    'plant collision': (230, 159, 0),
+    'rain': (0, 114, 178),
+    'sky': (204, 121, 167),
+    'camera': (0, 158, 115),
+    'overlay': (240, 228, 66),
+}
+TOTALS = ('update', 'draw', 'frame')
+
+class Profiler:
+    # WHILE ENABLED THE HOOKED METHODS ARE SHADOWED BY TIMED WRAPPERS ON THEIR INSTANCES,
+    # DISABLING DELETES THE WRAPPERS AGAIN SO THE GAME RUNS THE PLAIN METHODS AT NO COST
+    def __init__(self, level, history = PROFILER_HISTORY) -> None:
+        self.level = level
+        self.display_surf = pygame.display.get_surface()
+        self.enabled = False
+
+        #HOOKS, (OWNER, METHOD NAME, SECTION)
+        self.hooks = [
+            (level, 'update', 'update'),
+            (level.animations, 'update', 'sprites'),
+            (level.all_sprites, 'update', 'sprites'),
+            (level, 'plant_collision', 'plant collision'),
+            (level.rain, 'update', 'rain'),
+            (level.sky, 'update', 'sky'),
+            (level.post_process, 'display', 'sky'),
+            (level.all_sprites, 'custom_draw', 'camera'),
+            (level.overlay, 'display', 'overlay'),
+            (level.menu, 'display', 'overlay'),
+        ]
+
+        #SAMPLES IN NANOSECONDS, ONE ENTRY PER RENDERED FRAME
+        self.names = list(SECTIONS) + list(TOTALS)
+        self.current = dict.fromkeys(self.names, 0)
+        self.history = {name: deque(maxlen = history) for name in self.names}
+
+        #GRAPHICS
+        self.font = pygame.font.Font(f'{FONT_DIR}/LycheeSoda.ttf', 20)
+        self.graph_height = 120
+        self.panel = pygame.Surface((history // 2 + 20, self.graph_height + 20 + self.font.get_height() * 22))
+        self.panel.set_alpha(200)
+        self.panel_rect = self.panel.get_rect(topright = (SCREEN_WIDTH - 10, 10))
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for owner, method, name in self.hooks:
+            setattr(owner, method, self.wrap(getattr(owner, method), name))
+        self.level.draw = self.wrap_draw(self.level.draw)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for owner, method, name in self.hooks:
+            owner.__dict__.pop(method, None)
+        self.level.__dict__.pop('draw', None)
+        self.current = dict.fromkeys(self.names, 0)
+
+    def wrap(self, func, name):
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            result = func(*args, **kwargs)
+            self.current[name] += perf_counter_ns() - start
+            return result
+        return timed
+
+    def wrap_draw(self, func):
+        # A RENDERED FRAME ENDS AFTER THE DRAW, THE PANEL ITSELF IS NOT TIMED
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            dirty = func(*args, **kwargs)
+            self.current['draw'] += perf_counter_ns() - start
+            self.end_frame()
+            self.display()
+            return [self.display_surf.get_rect()]
+        return timed
+
+    def end_frame(self):
+        current = self.current
+        current['frame'] = current['update'] + current['draw']
+        for name in self.names:
+            self.history[name].append(current[name])
+            current[name] = 0
+
+    def layer_counts(self):
+        # LIVE SPRITES PER LAYER, PARTICLE RENDERERS ARE COUNTED WITH THEIR LAYER
+        all_sprites = self.level.all_sprites
+        counts = {}
+        for name, z in LAYERS.items():
+            counts[name] = len(all_sprites.layers[z]) + sum(len(renderer) for renderer in all_sprites.renderers.get(z, ()))
+        return counts
+
+    def average_ms(self, name, frames = 60):
+        samples = list(self.history[name])[-frames:]
+        return sum(samples) / len(samples) / 1e6 if samples else 0
+
+    def display(self):
+        panel = self.panel
+        panel.fill('black')
+        width = panel.get_width() - 20
+        bottom = self.graph_height + 10
+        scale = self.graph_height / 33.3 # TWO 60 FPS FRAMES FILL THE GRAPH
+
+        #STACKED FRAME GRAPH, TWO FRAMES PER PIXEL COLUMN
+        frames = len(self.history['frame'])
+        for column, index in enumerate(range(frames % 2, frames, 2)):
+            y = bottom
+            stacked = 0
+            for name, color in SECTIONS.items():
+                height = self.history[name][index] / 1e6 * scale
+                pygame.draw.line(panel, color, (10 + column, y), (10 + column, y - height))
+                y -= height
+                stacked += self.history[name][index]
+            rest = (self.history['frame'][index] - stacked) / 1e6 * scale
+            pygame.draw.line(panel, 'gray', (10 + column, y), (10 + column, y - rest))
+        budget_y = bottom - 1000 / TICK_RATE * scale
+        pygame.draw.line(panel, 'white', (10, budget_y), (10 + width, budget_y))
+
+        #SECTION TIMES
+        lines = [(f'{name} {self.average_ms(name):.2f} ms', color) for name, color in SECTIONS.items()]
+        lines += [(f'{name} {self.average_ms(name):.2f} ms', 'white') for name in TOTALS]
+
+        #SPRITE COUNTS
+        lines.append((f'sprites {len(self.level.all_sprites)}', 'white'))
+        lines += [(f'  {name} {count}', 'white') for name, count in self.layer_counts().items()]
+
+        y = bottom + 10
+        for text, color in lines:
+            panel.blit(self.font.render(text, False, color), (10, y))
+            y += self.font.get_height()
+
+        self.display_surf.blit(panel, self.panel_rect)
+
+    def histogram(self, name):
+        bucket_ns = PROFILER_BUCKET_MS * 1_000_000
+        counts = [0] * PROFILER_BUCKETS
+        for sample in self.history[name]:
+            counts[min(sample // bucket_ns, PROFILER_BUCKETS - 1)] += 1
+        return counts
+
+    def dump(self, path):
+        # .csv WRITES ONE ROW PER BUCKET, ANYTHING ELSE IS WRITTEN AS JSON
+        if str(path).endswith('.csv'):
+            with open(path, 'w', newline = '') as file:
+                writer = csv.writer(file)
+                writer.writerow(['bucket_ms'] + self.names)
+                histograms = [self.histogram(name) for name in self.names]
+                for bucket, counts in enumerate(zip(*histograms)):
+                    writer.writerow([bucket * PROFILER_BUCKET_MS] + list(counts))
+            return
+
+        report = {
+            'frames': len(self.history['frame']),
+            'bucket_ms': PROFILER_BUCKET_MS,
+            'sections': {
+                name: {
+                    'mean_ms': self.average_ms(name, len(self.history[name])),
+                    'max_ms': max(self.history[name], default = 0) / 1e6,
+                    'histogram': self.histogram(name),
+                }
+                for name in self.names
+            },
+        }
+        with open(path, 'w') as file:
+            json.dump(report, file, indent = 4)
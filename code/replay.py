@@ -0,0 +1,114 @@
+import sys, json, zlib, struct, argparse
+from array import array
+from random import randrange
+from time import perf_counter_ns
+import pygame
+from settings import *
+from support import rng
+from headless import KeyState, HeadlessGame
+from benchmark import summarize
+
+# RECORD:  python main.py --record session.rec
+# REPLAY:  python replay.py session.rec --render --output frames.json
+
+#FILE FORMAT
+# HEADER, THEN ONE zlib COMPRESSED uint16 KEY MASK PER SIMULATION TICK
+MAGIC = b'PDRP'
+VERSION = 1
+HEADER = struct.Struct('<4sHIHH') # MAGIC, VERSION, SEED, TICK RATE, KEY COUNT
+
+#KEYS READ BY Player.input AND Menu.input, ONE BIT EACH
+RECORD_KEYS = (
+    pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT,
+    pygame.K_SPACE, pygame.K_q, pygame.K_LCTRL, pygame.K_e,
+    pygame.K_RETURN, pygame.K_ESCAPE,
+)
+
+def mask_keys(mask):
+    return [key for bit, key in enumerate(RECORD_KEYS) if mask & 1 << bit]
+
+class Recorder:
+    # WRAPS AN INPUT SOURCE, SEEDS THE RANDOM STREAM AND CAPTURES ONE KEY MASK PER TICK
+    def __init__(self, path, seed = None, get_keys = pygame.key.get_pressed) -> None:
+        self.path = path
+        self.seed = randrange(2 ** 32) if seed is None else seed
+        self.get_keys = get_keys
+        self.masks = array('H')
+        self.state = KeyState()
+        rng.seed(self.seed)
+
+    def tick(self):
+        keys = self.get_keys()
+        mask = 0
+        for bit, key in enumerate(RECORD_KEYS):
+            if keys[key]:
+                mask |= 1 << bit
+        self.masks.append(mask)
+        self.state = KeyState(mask_keys(mask))
+
+    def __call__(self):
+        return self.state
+
+    def save(self):
+        save_recording(self.path, self.seed, self.masks)
+
+def save_recording(path, seed, masks):
+    masks = array('H', masks)
+    if sys.byteorder == 'big':
+        masks.byteswap()
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, seed, TICK_RATE, len(RECORD_KEYS)))
+        file.write(zlib.compress(masks.tobytes()))
+
+def load_recording(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    magic, version, seed, tick_rate, key_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} is not a version {VERSION} recording')
+    if tick_rate != TICK_RATE or key_count != len(RECORD_KEYS):
+        raise ValueError(f'{path} was recorded with a different tick rate or key layout')
+
+    masks = array('H')
+    masks.frombytes(zlib.decompress(data[HEADER.size:]))
+    if sys.byteorder == 'big':
+        masks.byteswap()
+    return seed, masks
+
+def to_script(masks):
+    # RUN LENGTH (ticks, keys) STEPS FOR ScriptedInput
+    script = []
+    for mask in masks:
+        if script and script[-1][2] == mask:
+            script[-1][0] += 1
+        else:
+            script.append([1, mask_keys(mask), mask])
+    return [(ticks, keys) for ticks, keys, _ in script]
+
+def replay(path, render = False):
+    # RE-RUNS THE SESSION TICK FOR TICK AND TIMES EVERY TICK
+    seed, masks = load_recording(path)
+    game = HeadlessGame(script = to_script(masks), render = render, seed = seed)
+
+    timings = []
+    for _ in range(len(masks)):
+        start = perf_counter_ns()
+        game.tick()
+        timings.append(perf_counter_ns() - start)
+    return game, timings
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Replay a recorded session and report per-tick timings.')
+    parser.add_argument('recording')
+    parser.add_argument('--render', action = 'store_true', help = 'include drawing in the timings')
+    parser.add_argument('--output', help = 'write the per-tick timings (ms) as JSON')
+    args = parser.parse_args()
+
+    game, timings = replay(args.recording, args.render)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump([timing / 1e6 for timing in timings], file)
+
+    print(json.dumps(summarize(timings), indent = 4))
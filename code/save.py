@@ -0,0 +1,192 @@
+import os, math, zlib, struct
+from threading import Thread
+from settings import *
+from soil import TILLED, WATERED, PLANTED
+from support import map_size
+
+# THE GAME AUTOSAVES TO SAVE_FILE EVERY NEW DAY:  python main.py
+# START A NEW FARM INSTEAD OF LOADING IT:        python main.py --new
+
+#FILE FORMAT
+# HEADER, THEN ONE zlib COMPRESSED BODY, EVERY FLOAT IS A float64 SO A LOAD RESTORES THE EXACT STATE:
+#   PLAYER, WORLD, ITEM AND SEED COUNTS (int32 EACH),
+#   THE SOIL GRID (ONE FLAG BYTE PER TILE), PLANT RECORDS, TREE RECORDS
+MAGIC = b'PDSV'
+VERSION = 3
+HEADER = struct.Struct('<4sHHHIIBB') # MAGIC, VERSION, GRID WIDTH, GRID HEIGHT, PLANTS, TREES, ITEMS, SEEDS
+PLAYER = struct.Struct('<ddiBB') # X, Y, MONEY, TOOL INDEX, SEED INDEX
+WORLD = struct.Struct('<d?') # TIME OF DAY, RAINING
+PLANT = struct.Struct('<HHBd') # CELL X, CELL Y, SEED INDEX, AGE
+TREE = struct.Struct('<bBB') # HEALTH, ALIVE, APPLE MASK
+
+def snapshot(level):
+    # COPIES THE MUTABLE WORLD STATE INTO PLAIN VALUES, SO IT CAN BE ENCODED OFF THE MAIN THREAD
+    player = level.player
+    soil_layer = level.soil_layer
+    return {
+        'grid': (soil_layer.grid.width, soil_layer.grid.height, bytes(soil_layer.grid.cells)),
+        'player': (player.pos.x, player.pos.y, player.money, player.tool_index, player.seed_index),
+        'world': (level.sky.time, level.raining),
+        'items': tuple(player.item_inventory.values()),
+        'seeds': tuple(player.seed_inventory.values()),
+        'plants': [
+            (x, y, player.seeds.index(plant.plant_type), plant.age)
+            for (x, y), plant in soil_layer.plants.items()
+        ],
+        'trees': [
+            (tree.health, tree.alive, tree.apple_mask())
+            for tree in level.tree_sprites.sprites()
+        ],
+    }
+
+def encode(state):
+    width, height, cells = state['grid']
+    items, seeds = state['items'], state['seeds']
+    header = HEADER.pack(MAGIC, VERSION, width, height, len(state['plants']), len(state['trees']), len(items), len(seeds))
+
+    body = b''.join([
+        PLAYER.pack(*state['player']),
+        WORLD.pack(*state['world']),
+        struct.pack(f'<{len(items)}i', *items),
+        struct.pack(f'<{len(seeds)}i', *seeds),
+        cells,
+        b''.join([PLANT.pack(*plant) for plant in state['plants']]),
+        b''.join([TREE.pack(*tree) for tree in state['trees']]),
+    ])
+    return header + zlib.compress(body)
+
+def decode(data):
+    # EVERY MALFORMED FILE RAISES ValueError
+    if len(data) < HEADER.size:
+        raise ValueError('save is truncated')
+    magic, version, width, height, plant_count, tree_count, item_count, seed_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'not a version {VERSION} save')
+    try:
+        body = memoryview(zlib.decompress(data[HEADER.size:]))
+    except zlib.error as error:
+        raise ValueError(f'save is corrupt: {error}')
+
+    #SECTIONS IN FILE ORDER
+    sizes = [
+        PLAYER.size, WORLD.size, item_count * 4, seed_count * 4, 
+        width * height, plant_count * PLANT.size, tree_count * TREE.size,
+    ]
+    if len(body) != sum(sizes):
+        raise ValueError(f'save body is {len(body)} bytes, the header describes {sum(sizes)}')
+    sections = []
+    offset = 0
+    for size in sizes:
+        sections.append(body[offset:offset + size])
+        offset += size
+    player, world, items, seeds, cells, plants, trees = sections
+
+    return {
+        'grid': (width, height, bytes(cells)),
+        'player': PLAYER.unpack(player),
+        'world': WORLD.unpack(world),
+        'items': struct.unpack(f'<{item_count}i', items),
+        'seeds': struct.unpack(f'<{seed_count}i', seeds),
+        'plants': list(PLANT.iter_unpack(plants)),
+        'trees': list(TREE.iter_unpack(trees)),
+    }
+
+def apply(level, state):
+    # RESTORES THE SAVED STATE ONTO A FRESHLY BUILT LEVEL, THE STATIC MAP IS LEFT AS IT IS
+    player = level.player
+    soil_layer = level.soil_layer
+
+    width, height, cells = state['grid']
+    if (width, height) != (soil_layer.grid.width, soil_layer.grid.height):
+        raise ValueError(f'save was made for a {width}x{height} map')
+    trees = level.tree_sprites.sprites()
+    if len(state['trees']) != len(trees):
+        raise ValueError(f'save was made for a map with {len(state["trees"])} trees')
+    if len(state['items']) != len(player.item_inventory) or len(state['seeds']) != len(player.seed_inventory):
+        raise ValueError('save has a different inventory layout')
+    x, y, _, tool_index, seed_index = state['player']
+    if tool_index >= len(player.tools) or seed_index >= len(player.seeds):
+        raise ValueError('save selects an unknown tool or seed')
+    map_w, map_h = map_size()
+    if not (math.isfinite(x) and math.isfinite(y) and 0 <= x < map_w and 0 <= y < map_h):
+        raise ValueError(f'save puts the player outside the map at {x}, {y}')
+    time, _ = state['world']
+    if not (math.isfinite(time) and time >= 0):
+        raise ValueError(f'save has an invalid time of day {time}')
+
+    #GRID FLAGS, WATER AND PLANTS ONLY EVER SIT ON TILLED SOIL
+    if any(value & (WATERED | PLANTED) and not value & TILLED for value in cells):
+        raise ValueError('save has water or plants on untilled soil')
+    planted_cells = {(index % width, index // width) for index, value in enumerate(cells) if value & PLANTED}
+
+    planted = set()
+    for x, y, seed, age in state['plants']:
+        if seed >= len(player.seeds) or (x, y) in planted or (x, y) not in planted_cells or not math.isfinite(age):
+            raise ValueError(f'save has an invalid plant at {x}, {y}')
+        planted.add((x, y))
+    if planted != planted_cells:
+        raise ValueError(f'save has {len(planted_cells - planted)} planted cells without a plant')
+
+    # NOTHING BELOW CAN FAIL, SO A REJECTED SAVE LEAVES THE LEVEL UNTOUCHED
+
+    #WORLD
+    level.sky.time, level.raining = state['world']
+    soil_layer.raining = level.raining
+
+    #FARM
+    soil_layer.load(cells, [(x, y, player.seeds[seed], age) for x, y, seed, age in state['plants']])
+
+    #TREES
+    for tree, (health, alive, apple_mask) in zip(trees, state['trees']):
+        tree.health = health
+        if tree.alive and not alive:
+            tree.stump()
+        for apple in tree.apple_sprites.sprites():
+            apple.kill()
+        for bit, pos in enumerate(tree.apple_pos):
+            if apple_mask & 1 << bit:
+                tree.create_apple(pos)
+
+    #PLAYER
+    x, y, player.money, player.tool_index, player.seed_index = state['player']
+    player.selected_tool = player.tools[player.tool_index]
+    player.selected_seed = player.seeds[player.seed_index]
+    player.pos.update(x, y)
+    player.hitbox.center = round(x), round(y)
+    player.rect.center = player.hitbox.center
+    player.prev_center.update(player.rect.center)
+    for key, amount in zip(list(player.item_inventory), state['items']):
+        player.item_inventory[key] = amount
+    for key, amount in zip(list(player.seed_inventory), state['seeds']):
+        player.seed_inventory[key] = amount
+
+def write(path, data):
+    # WRITE NEXT TO THE TARGET AND SWAP IT IN, SO A CRASH NEVER LEAVES HALF A SAVE
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+def save_game(path, level):
+    write(path, encode(snapshot(level)))
+
+def load_game(path, level):
+    with open(path, 'rb') as file:
+        apply(level, decode(file.read()))
+
+class AutoSave:
+    # THE SNAPSHOT IS TAKEN ON THE CALLER'S THREAD, ENCODING AND WRITING HAPPEN IN THE BACKGROUND
+    def __init__(self, path) -> None:
+        self.path = path
+        self.thread = None
+
+    def save(self, level):
+        state = snapshot(level)
+        self.wait()
+        self.thread = Thread(target = lambda: write(self.path, encode(state)), daemon = True)
+        self.thread.start()
+
+    def wait(self):
+        if self.thread:
+            self.thread.join()
+            self.thread = None
@@ -15,6 +15,7 @@ RAIN_D_DIR = Path(__file__).resolve().parent.parent/'graphics'/'rain'/'drops'
 RAIN_F_DIR = Path(__file__).resolve().parent.parent/'graphics'/'rain'/'floor'
 FONT_DIR = Path(__file__).resolve().parent.parent/'font'
 AUDIO_DIR = Path(__file__).resolve().parent.parent/'audio'
+SAVE_FILE = Path(__file__).resolve().parent.parent/'save.sav'
 
 
 #GAME SCREEN
@@ -22,6 +23,41 @@ SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 TILE_SIZE = 64
 
+#GAME LOOP
+TICK_RATE = 60 # FIXED SIMULATION UPDATES PER SECOND
+MAX_FPS = 120 # RENDER CAP, 0 MEANS UNCAPPED
+MAX_STEPS = 5 # MAX CATCH-UP UPDATES PER RENDERED FRAME
+
+#DIRTY RECT RENDERING
+DIRTY_RECTS = False # ONLY REDRAW CHANGED REGIONS WHILE THE CAMERA IS STILL
+DIRTY_RECT_LIMIT = 8 # MORE REGIONS THAN THIS ARE MERGED INTO ONE
+
+#SPATIAL INDEX
+SPATIAL_CELL_SIZE = TILE_SIZE * 4
+
+#PRE-BAKED STATIC MAP CHUNKS
+CHUNK_SIZE = 512
+
+#RAIN
+RAIN_CAPACITY = 512 # HARD CAP ON LIVE PARTICLES PER RAIN LAYER
+RAIN_DENSITY = { # PARTICLES PER SECOND FOR ONE SCREEN OF AREA
+    'floor': 40,
+    'drops': 40,
+}
+RAIN_MARGIN = TILE_SIZE * 2 # SPAWN BORDER AROUND THE VIEWPORT
+
+#DAYLIGHT
+SKY_NIGHT_COLOR = (38, 101, 189) # TINT THE DAY FADES INTO
+SKY_SPEED = 2 # TINT STEPS PER SECOND OF IN-GAME TIME
+
+#ASSET CACHE
+ASSET_CACHE_SIZE = 256
+
+#PROFILER
+PROFILER_HISTORY = 600 # ROLLING WINDOW OF FRAMES KEPT FOR THE GRAPH AND THE HISTOGRAM
+PROFILER_BUCKET_MS = 1 # HISTOGRAM BUCKET WIDTH
+PROFILER_BUCKETS = 50 # THE LAST BUCKET ALSO COUNTS EVERYTHING SLOWER
+
 #OVERLAY POSITIONS
 OVERLAY_POSITIONS = {
     'tool': (40, SCREEN_HEIGHT - 15),
@@ -49,6 +85,12 @@ LAYERS = {
     'rain drops': 10,
 }
 
+#LAYERS THAT OVERLAP THE PLAYER AND NEED DEPTH (Y) SORTING
+Y_SORT_LAYERS = {
+    LAYERS['ground plant'],
+    LAYERS['main'],
+}
+
 APPLE_POS = {
     'Small': [(18,17), (30, 37), (12, 50), (30, 45), (20, 30), (30, 10)],
     'Large': [(30, 24), (60, 65), (50, 50), (16, 40), (45, 50), (42, 70)],
@@ -1,73 +1,143 @@
 import pygame
 from settings import *
-from support import import_folder
-from sprites import Generic
-from random import randint, choice
+from support import import_folder, map_size, rng
+from array import array
+from random import Random
 
 class Sky:
+    # DAYLIGHT IS READ FROM THE IN-GAME CLOCK, THE WHOLE DUSK IS A PRECOMPUTED TABLE OF TINTS
     def __init__(self) -> None:
-        self.display_surf = pygame.display.get_surface()
-        self.full_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.start_color = [255, 255, 255]
-        self.end_color = (38, 101, 189)
-    
-    def display(self, dt):
-        for index, value in enumerate(self.end_color):
-            if self.start_color[index] > value:
-                self.start_color[index] -= 2*dt
-
-        self.full_surf.fill(self.start_color)
-        self.display_surf.blit(self.full_surf, (0,0), special_flags = pygame.BLEND_RGB_MULT)
-
-class Drop(Generic):
-    def __init__(self, pos, surf, groups, moving, z) -> None:
-        #GENERAL SETUP
-        super().__init__(pos, surf, groups, z)
-        self.lifetime = randint(400, 500)
-        self.start_time = pygame.time.get_ticks()
-
-        #MOVING
-        self.moving = moving
-        if self.moving:
-            self.pos = pygame.math.Vector2(self.rect.topleft)
-            self.direction = pygame.math.Vector2(-2, 4)
-            self.speed = randint(200, 250)
-    
+        self.end_color = SKY_NIGHT_COLOR
+        self.colors = [tuple(max(value, 255 - step) for value in self.end_color) for step in range(256)]
+        self.time = 0
+
+    def reset(self):
+        self.time = 0
+
+    def update(self, dt):
+        self.time += dt
+
+    def color(self):
+        return self.colors[min(int(self.time * SKY_SPEED), len(self.colors) - 1)]
+
+class RainParticles:
+    # PREALLOCATED PARTICLE POOL, DEAD SLOTS ARE RECYCLED INSTEAD OF
+    # CREATING AND KILLING A SPRITE FOR EVERY DROP
+    def __init__(self, surfs, capacity, z, random) -> None:
+        self.surfs = surfs
+        self.random = random
+        self.capacity = capacity
+        self.z = z
+
+        #PARTICLE STATE
+        self.x = array('f', [0]) * capacity
+        self.y = array('f', [0]) * capacity
+        self.vx = array('f', [0]) * capacity
+        self.vy = array('f', [0]) * capacity
+        self.life = array('f', [0]) * capacity
+        self.image = array('B', [0]) * capacity
+
+        #POOL
+        self.free = list(range(capacity - 1, -1, -1))
+        self.active = []
+
+    def emit(self, pos, velocity, lifetime):
+        if not self.free:
+            return
+
+        index = self.free.pop()
+        self.x[index], self.y[index] = pos
+        self.vx[index], self.vy[index] = velocity
+        self.life[index] = lifetime
+        self.image[index] = self.random.randint(0, len(self.surfs) - 1)
+        self.active.append(index)
+
     def update(self, dt):
-        #MOVEMENT
-        if self.moving:
-            self.pos += self.direction * self.speed * dt
-            self.rect.topleft = (round(self.pos.x), round(self.pos.y))
-        
-        #TIMER
-        if pygame.time.get_ticks() - self.start_time >= self.lifetime:
-            self.kill()
+        x, y, vx, vy, life = self.x, self.y, self.vx, self.vy, self.life
+        active = []
+        for index in self.active:
+            life[index] -= dt
+            if life[index] <= 0:
+                self.free.append(index)
+                continue
+            x[index] += vx[index] * dt
+            y[index] += vy[index] * dt
+            active.append(index)
+        self.active = active
+
+    def queue(self, blit_list, offset):
+        surfs, image, x, y = self.surfs, self.image, self.x, self.y
+        ox, oy = offset
+        blit_list.extend([(surfs[image[index]], (x[index] - ox, y[index] - oy)) for index in self.active])
+
+    def __len__(self):
+        return len(self.active)
 
 class Rain:
     def __init__(self, all_sprites) -> None:
         self.all_sprites = all_sprites
-        self.rain_drops = import_folder(RAIN_D_DIR)
-        self.rain_floors = import_folder(RAIN_F_DIR)
-        self.floor_w, self.floor_h = pygame.image.load(f'{WORLD_DIR}/ground.png').get_size()
+        self.floor_w, self.floor_h = map_size()
+
+        #COSMETIC RANDOM STREAM, SPAWN AREAS DEPEND ON THE CAMERA AND MUST NOT TOUCH THE GAMEPLAY STREAM
+        self.random = Random(rng.getrandbits(32))
+
+        #PARTICLES
+        self.floors = RainParticles(import_folder(RAIN_F_DIR), RAIN_CAPACITY, LAYERS['rain floor'], self.random)
+        self.drops = RainParticles(import_folder(RAIN_D_DIR), RAIN_CAPACITY, LAYERS['rain drops'], self.random)
+        self.all_sprites.add_renderer(self.floors)
+        self.all_sprites.add_renderer(self.drops)
+
+        #EMITTER, SPAWN AREAS ARE RELATIVE TO THE VIEWPORT
+        self.drop_speed = (200, 250)
+        self.lifetime = (400, 500) # MILLISECONDS
+        self.floor_area = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT).inflate(RAIN_MARGIN * 2, RAIN_MARGIN * 2)
+
+        # DROPS FALL DOWN AND TO THE LEFT, SO THEIR AREA ALSO REACHES AS FAR
+        # ABOVE AND TO THE RIGHT AS THE FASTEST DROP TRAVELS IN ITS LIFETIME
+        max_travel = self.drop_speed[1] * self.lifetime[1] / 1000
+        self.drop_area = self.floor_area.copy()
+        self.drop_area.width += round(2 * max_travel)
+        self.drop_area.height += round(4 * max_travel)
+        self.drop_area.bottomleft = self.floor_area.bottomleft
+
+        screen_area = SCREEN_WIDTH * SCREEN_HEIGHT
+        self.floor_rate = RAIN_DENSITY['floor'] * self.floor_area.width * self.floor_area.height / screen_area
+        self.drop_rate = RAIN_DENSITY['drops'] * self.drop_area.width * self.drop_area.height / screen_area
+        self.floor_timer = 0
+        self.drop_timer = 0
+
+    def random_pos(self, area):
+        # ONLY AROUND THE CURRENT VIEWPORT, CLAMPED TO THE MAP
+        offset = self.all_sprites.offset
+        area = area.move(int(offset.x), int(offset.y)).clip(0, 0, self.floor_w, self.floor_h)
+        return self.random.randint(area.left, area.right), self.random.randint(area.top, area.bottom)
     
     def create_floor(self):
-        Drop(
-            surf = choice(self.rain_floors),
-            pos = (randint(0, self.floor_w), randint(0, self.floor_h)),
-            moving = False,
-            groups = self.all_sprites,
-            z = LAYERS['rain floor'],
+        self.floors.emit(
+            pos = self.random_pos(self.floor_area),
+            velocity = (0, 0),
+            lifetime = self.random.randint(*self.lifetime) / 1000,
         )
+
     def create_drops(self): 
-        Drop(
-            surf = choice(self.rain_drops),
-            pos = (randint(0, self.floor_w), randint(0, self.floor_h)),
-            moving = True,
-            groups = self.all_sprites,
-            z = LAYERS['rain drops'],
+        speed = self.random.randint(*self.drop_speed)
+        self.drops.emit(
+            pos = self.random_pos(self.drop_area),
+            velocity = (-2 * speed, 4 * speed),
+            lifetime = self.random.randint(*self.lifetime) / 1000,
         )
-    def update(self):
-        self.create_floor()
-        self.create_drops()
 
+    def update(self, dt, spawn = True):
+        if spawn:
+            self.floor_timer += self.floor_rate * dt
+            while self.floor_timer >= 1:
+                self.create_floor()
+                self.floor_timer -= 1
+
+            self.drop_timer += self.drop_rate * dt
+            while self.drop_timer >= 1:
+                self.create_drops()
+                self.drop_timer -= 1
 
+        self.floors.update(dt)
+        self.drops.update(dt)
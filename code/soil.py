@@ -1,8 +1,75 @@
 import pygame
 from settings import *
-from pytmx.util_pygame import load_pygame
 from support import *
-from random import choice
+from spatial import SpatialGrid
+
+#SOIL CELL FLAGS
+FARMABLE = 1
+TILLED = 2
+WATERED = 4
+PLANTED = 8
+
+#AUTOTILE LOOKUP, INDEXED BY THE TILLED NEIGHBOURS MASK
+#TOP = 1, RIGHT = 2, BOTTOM = 4, LEFT = 8
+SOIL_TILE_TYPES = [
+    'o', 'b', 'l', 'bl', 
+    't', 'tb', 'tl', 'tbr', 
+    'r', 'br', 'lr', 'lrb', 
+    'tr', 'tbl', 'lrt', 'x',
+]
+
+class SoilGrid:
+    # ONE BYTE OF FLAGS PER TILE, STORED ROW BY ROW
+    def __init__(self, width, height) -> None:
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)
+        self.tables = {}
+
+    def has(self, x, y, flag):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[y * self.width + x] & flag == flag
+        return False
+
+    def set(self, x, y, flag):
+        self.cells[y * self.width + x] |= flag
+
+    def clear(self, x, y, flag):
+        self.cells[y * self.width + x] &= ~flag & 0xFF
+
+    def table(self, key, func):
+        # 256 ENTRY LOOKUP TABLES FOR bytearray.translate
+        if key not in self.tables:
+            self.tables[key] = bytes(func(value) for value in range(256))
+        return self.tables[key]
+
+    def matches(self, value, flag, without):
+        return value & flag == flag and not value & without
+
+    def find(self, flag, without = 0):
+        mask = self.cells.translate(self.table(
+            ('find', flag, without), 
+            lambda value: self.matches(value, flag, without)
+        ))
+
+        cells = []
+        index = mask.find(1)
+        while index != -1:
+            cells.append((index % self.width, index // self.width))
+            index = mask.find(1, index + 1)
+        return cells
+
+    def set_all(self, flag, where = 0, without = 0):
+        self.cells = self.cells.translate(self.table(
+            ('set', flag, where, without), 
+            lambda value: value | flag if self.matches(value, where, without) else value
+        ))
+
+    def clear_all(self, flag):
+        self.cells = self.cells.translate(self.table(
+            ('clear', flag), 
+            lambda value: value & ~flag & 0xFF
+        ))
 
 class SoilTile(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups) -> None:
@@ -19,14 +86,16 @@ class WaterTile(pygame.sprite.Sprite):
         self.z = LAYERS['soil water']
 
 class Plant(pygame.sprite.Sprite):
-    def __init__(self, plant_type, groups, soil, check_watered) -> None:
+    def __init__(self, plant_type, groups, soil, check_watered, mark_harvestable) -> None:
         super().__init__(groups)
         #PLANT SETUP
+        self.all_sprites = groups[0]
         self.soil = soil
         self.plant_type = plant_type
         plant_dir = FRUIT_DIR/plant_type
         self.frames = import_folder(plant_dir)
         self.check_watered = check_watered
+        self.mark_harvestable = mark_harvestable
         
         #PLANT GROWING
         self.age = 0
@@ -42,18 +111,24 @@ class Plant(pygame.sprite.Sprite):
 
     def grow(self):
         if self.check_watered(self.rect.center):
-            self.age += self.grow_speed
+            self.set_age(self.age + self.grow_speed)
 
-            if int(self.age) > 0:
-                self.z = LAYERS['main']
-                self.hitbox = self.rect.copy().inflate(-26, self.rect.height * 0.4)
+    def set_age(self, age):
+        self.age = age
 
-            if self.age >= self.max_age:
-                self.age = self.max_age
-                self.harvestable = True
+        if int(self.age) > 0:
+            self.z = LAYERS['main']
+            self.hitbox = self.rect.copy().inflate(-26, self.rect.height * 0.4)
 
-            self.image = self.frames[int(self.age)]
-            self.rect = self.image.get_rect(midbottom = self.soil.rect.midbottom + pygame.math.Vector2(0, self.y_offset))
+        if self.age >= self.max_age:
+            self.age = self.max_age
+            self.harvestable = True
+
+        self.image = self.frames[int(self.age)]
+        self.rect = self.image.get_rect(midbottom = self.soil.rect.midbottom + pygame.math.Vector2(0, self.y_offset))
+        self.all_sprites.refresh(self)
+        if self.harvestable:
+            self.mark_harvestable(self)
 
 class SoilLayer: 
     # collision_sprites qoyanda plantlerin icinden kece bilmirsen,
@@ -62,162 +137,169 @@ class SoilLayer:
         #SPRITE GROUPS
         self.all_sprites = all_sprites
         self.soil_sprites = pygame.sprite.Group()
+        self.soil_tiles = {}
+        self.water_tiles = {}
+        self.plants = {}
         self.water_sprites = pygame.sprite.Group()
         self.plant_sprites = pygame.sprite.Group()
 
+        #RIPE PLANTS ONLY, INDEXED BY THE TILES THEIR RECT COVERS
+        self.harvestable = SpatialGrid(TILE_SIZE)
+
         #GRAPHICS
         self.soil_surfs = import_folder_dict(f'{SOIL_DIR}/')
         self.water_surfs = import_folder(SOIL_WATER_DIR)
         
         self.create_soil_grid()
-        self.create_hit_rects()
 
         #SOUND
-        self.hoe_sound = pygame.mixer.Sound(f'{AUDIO_DIR}/hoe.wav')
+        self.hoe_sound = import_sound(f'{AUDIO_DIR}/hoe.wav')
         self.hoe_sound.set_volume(0.1)
         
-        self.plant_sound = pygame.mixer.Sound(f'{AUDIO_DIR}/plant.wav')
+        self.plant_sound = import_sound(f'{AUDIO_DIR}/plant.wav')
         self.plant_sound.set_volume(0.2)
 
     def create_soil_grid(self):
-        ground = pygame.image.load(f'{WORLD_DIR}/ground.png')
-        h_tiles, v_tiles = ground.get_width() // TILE_SIZE, ground.get_height() // TILE_SIZE
+        map_w, map_h = map_size()
+        h_tiles, v_tiles = map_w // TILE_SIZE, map_h // TILE_SIZE
 
-        self.grid = [[[] for col in range(h_tiles)] for row in range(v_tiles)]
-        for x, y, _ in load_pygame(f'{DATA_DIR}/map.tmx').get_layer_by_name('Farmable').tiles():
-            self.grid[y][x].append('F')
-    
-    def create_hit_rects(self):
-        self.hit_rects = []
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'F' in cell:
-                    x = index_col * TILE_SIZE
-                    y = index_row * TILE_SIZE
-                    rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-                    self.hit_rects.append(rect)
+        self.grid = SoilGrid(h_tiles, v_tiles)
+        for x, y, _ in import_map().get_layer_by_name('Farmable').tiles():
+            self.grid.set(x, y, FARMABLE)
     
+    def get_cell(self, pos):
+        # TOOL TARGETS MAP STRAIGHT TO A GRID CELL
+        return int(pos[0]) // TILE_SIZE, int(pos[1]) // TILE_SIZE
+
     def get_hit(self, point):
-        for rect in self.hit_rects:
-            if rect.collidepoint(point):
-                self.hoe_sound.play()
-                x = rect.x // TILE_SIZE
-                y = rect.y // TILE_SIZE
-
-                if 'F' in self.grid[y][x]:
-                    self.grid[y][x].append('X')
-                    self.create_soil_tiles()
-                    if self.raining:
-                        self.water_all()
+        x, y = self.get_cell(point)
+        if self.grid.has(x, y, FARMABLE):
+            self.hoe_sound.play()
+            self.grid.set(x, y, TILLED)
+            self.update_soil_tiles(x, y)
+            if self.raining:
+                self.water_all()
 
     def water(self, target_pos):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(target_pos):
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                self.grid[y][x].append('W')
-
-                WaterTile(
-                    pos = soil_sprite.rect.topleft, 
-                    surf = choice(self.water_surfs), 
-                    groups = [self.all_sprites, self.water_sprites],
-                )
+        x, y = self.get_cell(target_pos)
+        if (x, y) in self.soil_tiles and (x, y) not in self.water_tiles:
+            self.grid.set(x, y, WATERED)
+            self.create_water_tile(x, y)
+
+    def create_water_tile(self, x, y):
+        self.water_tiles[(x, y)] = WaterTile(
+            pos = (x * TILE_SIZE, y * TILE_SIZE), 
+            surf = rng.choice(self.water_surfs), 
+            groups = [self.all_sprites, self.water_sprites],
+        )
 
     def water_all(self):
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'X' in cell and 'W' not in cell:
-                    cell.append('W')
-                    x = index_col * TILE_SIZE
-                    y = index_row * TILE_SIZE
-                    WaterTile(
-                        pos = (x, y), 
-                        surf = choice(self.water_surfs), 
-                        groups = [self.all_sprites, self.water_sprites],
-                    )
+        cells = self.grid.find(TILLED, without = WATERED)
+        self.grid.set_all(WATERED, where = TILLED)
+
+        for x, y in cells:
+            self.create_water_tile(x, y)
  
     def remove_water(self):
         #DESTROY ALL WATER SPRITES
         for sprite in self.water_sprites.sprites():
             sprite.kill()
+        self.water_tiles.clear()
 
         #CLEAN UP THE GRID
-        for row in self.grid:
-            for cell in row:
-                if 'W' in cell:
-                    cell.remove('W')
+        self.grid.clear_all(WATERED)
 
     def check_watered(self, pos):
         x = pos[0] // TILE_SIZE
         y = pos[1] // TILE_SIZE
-        cell = self.grid[y][x]
 
-        is_watered = 'W' in cell
+        is_watered = self.grid.has(x, y, WATERED)
         return is_watered
     
     def plant_seed(self, target_pos, seed):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(target_pos):
-                self.plant_sound.play()
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                
-                if 'P' not in self.grid[y][x]:
-                    self.grid[y][x].append('P')
-                    Plant(
-                        plant_type = seed,
-                        soil = soil_sprite,
-                        groups = [self.all_sprites, self.plant_sprites],
-                        check_watered = self.check_watered,
-                    )
+        x, y = self.get_cell(target_pos)
+        if (x, y) in self.soil_tiles:
+            self.plant_sound.play()
+            
+            if not self.grid.has(x, y, PLANTED):
+                self.grid.set(x, y, PLANTED)
+                self.create_plant(x, y, seed)
+
+    def create_plant(self, x, y, seed):
+        plant = Plant(
+            plant_type = seed,
+            soil = self.soil_tiles[(x, y)],
+            groups = [self.all_sprites, self.plant_sprites],
+            check_watered = self.check_watered,
+            mark_harvestable = self.mark_harvestable,
+        )
+        self.plants[(x, y)] = plant
+        return plant
+
+    def mark_harvestable(self, plant):
+        self.harvestable.move(plant, plant.rect)
+
+    def harvestable_plants(self, rect):
+        # ONLY THE TILES UNDER rect ARE CHECKED, HOWEVER MANY CROPS ARE PLANTED
+        return [plant for plant in self.harvestable.query(rect) if plant.rect.colliderect(rect)]
+
+    def remove_plant(self, plant):
+        x, y = self.get_cell(plant.soil.rect.topleft)
+        self.harvestable.remove(plant)
+        plant.kill()
+        self.grid.clear(x, y, PLANTED)
+        del self.plants[(x, y)]
+
+    def load(self, cells, plants):
+        # REPLACES THE WHOLE FARM, plants ARE (x, y, plant_type, age) RECORDS
+        for plant in self.plant_sprites.sprites():
+            plant.kill()
+        self.plants.clear()
+        self.harvestable = SpatialGrid(TILE_SIZE)
+        self.remove_water()
+
+        self.grid.cells = bytearray(cells)
+        self.create_soil_tiles()
+        for x, y in self.grid.find(WATERED):
+            self.create_water_tile(x, y)
+
+        for x, y, plant_type, age in plants:
+            plant = self.create_plant(x, y, plant_type)
+            if age:
+                plant.set_age(age)
 
     def update_plants(self):
         for plant in self.plant_sprites.sprites():
             plant.grow()
 
     def create_soil_tiles(self):
-        self.soil_sprites.empty()
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'X' in cell:
-
-                    #TILE OPTIONS
-                    t = 'X' in self.grid[index_row - 1][index_col]
-                    b = 'X' in self.grid[index_row + 1][index_col]
-                    r = 'X' in row[index_col + 1]
-                    l = 'X' in row[index_col - 1]
-
-                    tile_type = 'o'
-
-                    #ALL SIDES
-                    if all((t, r, l, b)): tile_type = 'x' 
-
-                    #HORIZONTAL TILES ONLY
-                    if l and not any((t, r, b)): tile_type = 'r'
-                    if r and not any((t, l, b)): tile_type = 'l'
-                    if l and r and not any((t, b)): tile_type = 'lr'
-
-                    #VERTICAL ONLY
-                    if t and not any((l, r, b)): tile_type = 'b'
-                    if b and not any((t, r, l)): tile_type = 't'
-                    if t and b and not any((r, l)): tile_type = 'tb'
-
-                    #CORNERS ONLY
-                    if l and b and not any((t, r)): tile_type = 'tr'
-                    if r and b and not any((t, l)): tile_type = 'tl'
-                    if t and l and not any((b, r)): tile_type = 'br'
-                    if t and r and not any((l, b)): tile_type = 'bl'
-
-                    #T SHAPES
-                    if all((t, b, r)) and not l: tile_type = 'tbr'
-                    if all((t, b, l)) and not r: tile_type = 'tbl'
-                    if all((l, t, r)) and not b: tile_type = 'lrb'
-                    if all((b, l, r)) and not t: tile_type = 'lrt'
-
-                    SoilTile(
-                        (index_col * TILE_SIZE, index_row * TILE_SIZE), 
-                        self.soil_surfs[tile_type], 
-                        [self.all_sprites, self.soil_sprites]
-                    )
-
-
+        for soil_sprite in self.soil_sprites.sprites():
+            soil_sprite.kill()
+        self.soil_tiles.clear()
+
+        for x, y in self.grid.find(TILLED):
+            self.update_soil_tile(x, y)
+
+    def update_soil_tiles(self, x, y):
+        # A STRIKE ONLY CHANGES THE STRUCK CELL AND ITS FOUR NEIGHBOURS
+        for cell_x, cell_y in ((x, y), (x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+            if self.grid.has(cell_x, cell_y, TILLED):
+                self.update_soil_tile(cell_x, cell_y)
+
+    def update_soil_tile(self, x, y):
+        mask = (
+            self.grid.has(x, y - 1, TILLED) 
+            | self.grid.has(x + 1, y, TILLED) << 1 
+            | self.grid.has(x, y + 1, TILLED) << 2 
+            | self.grid.has(x - 1, y, TILLED) << 3
+        )
+        surf = self.soil_surfs[SOIL_TILE_TYPES[mask]]
+
+        if (x, y) in self.soil_tiles:
+            self.soil_tiles[(x, y)].image = surf
+        else:
+            self.soil_tiles[(x, y)] = SoilTile(
+                (x * TILE_SIZE, y * TILE_SIZE), 
+                surf, 
+                [self.all_sprites, self.soil_sprites]
+            )
@@ -0,0 +1,73 @@
+from settings import *
+
+class SpatialGrid:
+    def __init__(self, cell_size = SPATIAL_CELL_SIZE) -> None:
+        self.cell_size = cell_size
+        self.cells = {}
+        self.spans = {}
+
+    def span(self, rect):
+        size = self.cell_size
+        return (
+            rect.left // size, 
+            rect.top // size, 
+            (rect.right - 1) // size, 
+            (rect.bottom - 1) // size,
+        )
+
+    def insert(self, item, rect):
+        span = self.span(rect)
+        self.spans[item] = span
+        left, top, right, bottom = span
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                self.cells.setdefault((x, y), {})[item] = None
+
+    def remove(self, item):
+        span = self.spans.pop(item, None)
+        if span is None:
+            return
+
+        left, top, right, bottom = span
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                cell = self.cells[(x, y)]
+                del cell[item]
+                if not cell:
+                    del self.cells[(x, y)]
+
+    def move(self, item, rect):
+        # ONLY RE-BUCKET WHEN THE ITEM CROSSED A CELL BORDER
+        if self.spans.get(item) != self.span(rect):
+            self.remove(item)
+            self.insert(item, rect)
+
+    def query(self, rect):
+        found = {}
+        left, top, right, bottom = self.span(rect)
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                cell = self.cells.get((x, y))
+                if cell:
+                    found.update(cell)
+        return found
+
+    def __contains__(self, item):
+        return item in self.spans
+
+    def __len__(self):
+        return len(self.spans)
+
+def merge_rects(rects, limit):
+    # OVERLAPPING RECTS ARE JOINED, TOO MANY RECTS COLLAPSE INTO ONE
+    merged = []
+    for rect in rects:
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+
+    if len(merged) > limit:
+        return [merged[0].unionall(merged[1:])]
+    return merged
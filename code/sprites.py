@@ -1,7 +1,7 @@
 import pygame
 from settings import *
-from random import randint, choice
-from gametimer import Timer
+from gametimer import Timer, get_ticks
+from support import import_image, import_silhouette, import_sound, rng
 
 class Generic(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups, z = LAYERS['main']) -> None:
@@ -12,26 +12,26 @@ class Generic(pygame.sprite.Sprite):
         self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.2, -self.rect.height * 0.75)
 
 class Water(Generic):
-    def __init__(self, pos, frames, groups, ) -> None:
-        #ANIMATION
-        self.frames = frames
-        self.frames_index = 0
+    def __init__(self, pos, animation, groups) -> None:
+        #ANIMATION, SHARED WITH EVERY OTHER WATER TILE
+        self.animation = animation
 
         #SPRITE SETUP
         super().__init__(
                 pos = pos, 
-                surf = self.frames[self.frames_index],
+                surf = self.animation.image,
                 groups = groups,
                 z = LAYERS['water']
             )
-    def animate(self, dt):
-        self.frames_index += 5 * dt
-        if self.frames_index >= len(self.frames):
-            self.frames_index = 0
-        self.image = self.frames[int(self.frames_index)]
-    
-    def update(self, dt):
-        self.animate(dt)
+
+    @property
+    def image(self):
+        return self.animation.image
+
+    @image.setter
+    def image(self, surf):
+        # THE FRAME ALWAYS COMES FROM THE SHARED ANIMATION
+        pass
 
 class WildFlower(Generic):
     def __init__(self, pos, surf, groups) -> None:
@@ -41,34 +41,32 @@ class WildFlower(Generic):
 class Particle(Generic):
     def __init__(self, pos, surf, groups, z, duration = 200) -> None:
         super().__init__(pos, surf, groups, z = LAYERS['main'])
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = get_ticks()
         self.duration = duration
 
-        #WHITE SURFACE
-        mask_surf = pygame.mask.from_surface(self.image)
-        new_surf = mask_surf.to_surface()
-        new_surf.set_colorkey((0,0,0))
-        self.image = new_surf
+        #EXPIRY, SCHEDULED INSTEAD OF POLLED EVERY UPDATE
+        for group in self.groups():
+            if hasattr(group, 'expire'):
+                group.expire(self, self.start_time + self.duration)
 
-    def update(self, dt):
-        current_time = pygame.time.get_ticks()
-        if current_time - self.start_time > self.duration:
-            self.kill()
+        #WHITE SURFACE
+        self.image = import_silhouette(self.image)
 
 class Tree(Generic):
     def __init__(self, pos, surf, groups, name, player_add) -> None:
 
 
         super().__init__(pos, surf, groups)
+        self.all_sprites = groups[0]
 
         #TREE ATTRIBUTES
         self.health = 5
         self.alive = True
         stump_path = f'{STUMPS_DIR}/{"small" if name == "Small" else "large"}.png'
-        self.stump_surf = pygame.image.load(stump_path).convert_alpha()
+        self.stump_surf = import_image(stump_path)
 
         #APPLES
-        self.apples_surf = pygame.image.load(f'{FRUIT_DIR}/apple.png')
+        self.apples_surf = import_image(f'{FRUIT_DIR}/apple.png')
         self.apple_pos = APPLE_POS[name]
         self.apple_sprites = pygame.sprite.Group()
         self.create_fruit()
@@ -76,7 +74,7 @@ class Tree(Generic):
         self.player_add = player_add
 
         #SOUND
-        self.axe_sound = pygame.mixer.Sound(f'{AUDIO_DIR}/axe.mp3')
+        self.axe_sound = import_sound(f'{AUDIO_DIR}/axe.mp3')
 
     def damage(self):
 
@@ -88,47 +86,65 @@ class Tree(Generic):
 
         #REMOVE THE APPLE
         if len(self.apple_sprites.sprites()) > 0:
-            random_apple = choice(self.apple_sprites.sprites())
+            random_apple = rng.choice(self.apple_sprites.sprites())
             Particle(
                 pos = random_apple.rect.topleft,
                 surf = random_apple.image,
-                groups = self.groups()[0],
+                groups = self.all_sprites,
                 z = LAYERS['fruit'],
             )
             self.player_add('apple')
             random_apple.kill()
 
+        #ONLY A HIT CAN KILL THE TREE, SO IT IS CHECKED HERE INSTEAD OF EVERY UPDATE
+        if self.alive:
+            self.check_death()
+
     def check_death(self):
         if self.health <= 0:
             Particle(
                 pos = self.rect.topleft,
                 surf = self.image,
-                groups = self.groups()[0],
+                groups = self.all_sprites,
                 z = LAYERS['fruit'],
                 duration = 300, 
             )
-            self.image = self.stump_surf
-            self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
-            self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
-            self.alive = False
+            self.stump()
             self.player_add('wood')
 
-    def update(self, dt):
-        if self.alive:
-            self.check_death()
+    def stump(self):
+        self.image = self.stump_surf
+        self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
+        self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
+        for group in self.groups():
+            if hasattr(group, 'refresh'):
+                group.refresh(self)
+        self.alive = False
 
     def create_fruit(self):
 
         for pos in self.apple_pos:
-            if randint(0,10) < 2:
-                x = pos[0] + self.rect.left
-                y = pos[1] + self.rect.top
-                Generic(
-                    pos = (x, y), 
-                    surf = self.apples_surf, 
-                    groups = [self.apple_sprites, self.groups()[0]],
-                    z = LAYERS['fruit']
-                )
+            if rng.randint(0,10) < 2:
+                self.create_apple(pos)
+
+    def create_apple(self, pos):
+        x = pos[0] + self.rect.left
+        y = pos[1] + self.rect.top
+        Generic(
+            pos = (x, y), 
+            surf = self.apples_surf, 
+            groups = [self.apple_sprites, self.all_sprites],
+            z = LAYERS['fruit']
+        )
+
+    def apple_mask(self):
+        # ONE BIT PER ENTRY OF apple_pos THAT CURRENTLY HAS AN APPLE
+        slots = {(pos[0] + self.rect.left, pos[1] + self.rect.top): bit for bit, pos in enumerate(self.apple_pos)}
+        mask = 0
+        for apple in self.apple_sprites.sprites():
+            if apple.rect.topleft in slots:
+                mask |= 1 << slots[apple.rect.topleft]
+        return mask
 
 class Interaction(Generic):
     def __init__(self, pos, size, groups, name) -> None:
@@ -1,25 +1,106 @@
 from os import walk
+from collections import OrderedDict
+from random import Random
 import pygame
+from pytmx.util_pygame import load_pygame
+from settings import *
+
+class AssetCache:
+    # EVERY ASSET IS DECODED ONCE AND SHARED AFTER THAT,
+    # THE LEAST RECENTLY USED ENTRY IS DROPPED WHEN THE CACHE IS FULL
+    def __init__(self, max_size = ASSET_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        asset = load()
+        self.entries[key] = asset
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last = False)
+        return asset
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+assets = AssetCache()
+
+# EVERY GAMEPLAY RANDOM NUMBER COMES FROM THIS STREAM SO A SEED REPRODUCES A RUN
+rng = Random()
 
 def import_folder(path):
+    return assets.get(('folder', str(path)), lambda: load_folder(path))
+
+def load_folder(path):
 
     surface_list = []
 
     for _, __, img_files in walk(path):
         for image in img_files:
             full_path = path/image
-            image_surf = pygame.image.load(full_path).convert_alpha()
+            image_surf = import_image(full_path)
             surface_list.append(image_surf)
 
     return surface_list
 
 def import_folder_dict(path):
+    return assets.get(('folder dict', str(path)), lambda: load_folder_dict(path))
+
+def load_folder_dict(path):
     surface_dict = {}
 
     for _, __, img_files in walk(path):
         for image in img_files:
             full_path = path + '/' + image
-            image_surf = pygame.image.load(full_path).convert_alpha()
+            image_surf = import_image(full_path)
             surface_dict[image.split('.')[0]] = image_surf
     
-    return surface_dict
\ No newline at end of file
+    return surface_dict
+
+def import_image(path):
+    return assets.get(('image', str(path)), lambda: pygame.image.load(path).convert_alpha())
+
+def import_silhouette(surf):
+    # THE WHITE FLASH OF A SURFACE, BUILT ONCE FOR EVERY SOURCE SURFACE
+    return assets.get(('silhouette', surf), lambda: load_silhouette(surf))
+
+def load_silhouette(surf):
+    mask_surf = pygame.mask.from_surface(surf)
+    new_surf = mask_surf.to_surface()
+    new_surf.set_colorkey((0,0,0))
+    return new_surf
+
+class NullSound:
+    # STAND-IN FOR pygame.mixer.Sound WHEN THE MIXER IS NOT RUNNING (HEADLESS)
+    def play(self, *args, **kwargs):
+        pass
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+def import_sound(path):
+    if not pygame.mixer.get_init():
+        return NullSound()
+    return assets.get(('sound', str(path)), lambda: pygame.mixer.Sound(path))
+
+def import_map():
+    return assets.get('map', lambda: load_pygame(f'{DATA_DIR}/map.tmx'))
+
+def import_ground():
+    return import_image(f'{WORLD_DIR}/ground.png')
+
+def map_size():
+    tmx_data = import_map()
+    return tmx_data.width * tmx_data.tilewidth, tmx_data.height * tmx_data.tileheight
@@ -1,19 +1,16 @@
-import pygame
 from settings import *
 
 class Transition:
     def __init__(self, reset, player) -> None:
         #SETUP
-        self.display_surf = pygame.display.get_surface()
         self.reset = reset
         self.player = player
 
-        #OVERLAY IMAGE
-        self.image = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        #FADE, APPLIED BY THE POST-PROCESS PASS
         self.color = 255
         self.speed = -2
 
-    def play(self):
+    def update(self):
         self.color += self.speed
         if self.color <= 0:
             self.speed *= -1
@@ -24,5 +21,5 @@ class Transition:
             self.player.sleep = False
             self.speed = -2
 
-        self.image.fill((self.color, self.color, self.color))
-        self.display_surf.blit(self.image, (0,0), special_flags = pygame.BLEND_RGB_MULT)
+    def brightness(self):
+        return self.color if self.player.sleep else 255